@@ -0,0 +1,40 @@
+# _env.py
+"""
+Shared setup for the benchmark scripts. Importing it puts the backend on
+sys.path; bootstrap() configures the backend through the environment, so call
+it before importing any backend module (they read their settings at import):
+
+    import _env
+    _env.bootstrap(tts_cache=False)
+
+    from main import app  # noqa: E402
+"""
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+
+def bootstrap(fake_providers=True, tts_cache=True, **env):
+    """
+    fake_providers: answer Gemini/ElevenLabs from fake_providers.py, fully offline;
+                    False leaves the real clients (pointed at a stub by the caller).
+    tts_cache:      False when every turn speaks the same canned reply and the
+                    benchmark measures the provider path, not the TTS cache.
+    env:            any other settings, e.g. TRACE_LOG="0".
+    Startup TTS warming is always off, and the working directory moves to a
+    fresh temp dir so the SQLite database and disk TTS cache stay out of the repo.
+    """
+    if fake_providers:
+        os.environ["FAKE_PROVIDERS"] = "1"
+    else:
+        os.environ.pop("FAKE_PROVIDERS", None)
+    if not tts_cache:
+        os.environ["TTS_CACHE_MEMORY_BYTES"] = "0"
+        os.environ["TTS_CACHE_DIR"] = ""
+    os.environ["TTS_WARM_ON_STARTUP"] = "0"
+    os.environ.update(env)
+    os.chdir(tempfile.mkdtemp())
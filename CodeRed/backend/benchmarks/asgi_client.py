@@ -0,0 +1,63 @@
+# asgi_client.py
+"""
+Minimal in-process ASGI driver for the benchmarks.
+Unlike TestClient it records when every body chunk leaves the app, so
+streamed responses can be timed (time to first byte / first audio).
+"""
+import asyncio
+import json
+import time
+
+
+async def asgi_request(app, method, path, body=b"", headers=None, query_string=b"", keep_body=True):
+    """keep_body=False only counts response bytes, for memory measurements of the app itself."""
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body).encode("utf-8")
+        headers = {"content-type": "application/json", **(headers or {})}
+    headers = headers or {}
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query_string,
+        "root_path": "",
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+                   + [(b"content-length", str(len(body)).encode("latin-1"))],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    request_sent = False
+    finished = asyncio.Event()
+    result = {"status": None, "headers": {}, "chunks": [], "body_bytes": 0}
+    start = time.perf_counter()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            result["headers"] = {k.decode("latin-1"): v.decode("latin-1") for k, v in message["headers"]}
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            if chunk:
+                result["body_bytes"] += len(chunk)
+                result["chunks"].append((time.perf_counter() - start, chunk if keep_body else b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    result["elapsed"] = time.perf_counter() - start
+    result["body"] = b"".join(chunk for _, chunk in result["chunks"])
+    return result
@@ -0,0 +1,107 @@
+# bench_audio_responses.py
+"""
+/kitchen_converse response formats for long recipe narrations: JSON with
+base64 audio vs a streamed audio/mpeg body vs multipart/form-data.
+Reports bytes on the wire, time to first audio byte and the server's peak
+RSS growth. Each format runs in a fresh process so peaks don't mix.
+Runs entirely offline against fake_providers.
+
+    python benchmarks/bench_audio_responses.py [narration_chars ...]
+"""
+import asyncio
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import _env  # noqa: F401  (puts the backend on sys.path)
+
+FORMATS = ["application/json", "audio/mpeg", "multipart/form-data"]
+# ~128 kbps mp3 at normal speaking pace
+BYTES_PER_CHAR = 1000
+
+SENTENCE = "Stir the onions over a medium heat until they turn soft and golden, about eight minutes. "
+
+
+def narration(chars):
+    return (SENTENCE * (chars // len(SENTENCE) + 1))[:chars].rstrip() + "."
+
+
+def current_rss_kb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+
+
+async def measure(accept, chars):
+    import fake_providers
+    from asgi_client import asgi_request
+    from main import app, startup_event, shutdown_event
+
+    fake_providers.FAKE_INTENT_REPLY = f'items_to_add = []\nassistant_response = "{narration(chars)}"'
+    await startup_event()
+    try:
+        # Warm imports and pools on a short reply first, so they don't count towards the peak
+        fake_providers.FAKE_TTS_BYTES_PER_CHAR = 1
+        await asgi_request(app, "POST", "/kitchen_converse", {"user_query": "warm up"},
+                           headers={"accept": accept}, keep_body=False)
+        fake_providers.FAKE_TTS_BYTES_PER_CHAR = BYTES_PER_CHAR
+        gc.collect()
+        baseline_kb = current_rss_kb()
+
+        result = await asgi_request(app, "POST", "/kitchen_converse", {"user_query": "Read me the stew recipe"},
+                                    headers={"accept": accept}, keep_body=False)
+        assert result["status"] == 200, result["status"]
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        header_bytes = sum(len(k) + len(v) + 4 for k, v in result["headers"].items())
+        return {
+            "wire_bytes": header_bytes + result["body_bytes"],
+            "first_byte_ms": result["chunks"][0][0] * 1000,
+            "total_ms": result["elapsed"] * 1000,
+            "peak_rss_growth_mb": max(peak_kb - baseline_kb, 0) / 1024,
+        }
+    finally:
+        await shutdown_event()
+
+
+def run_child(accept, chars):
+    env = {
+        **os.environ,
+        "FAKE_PROVIDERS": "1",
+        "FAKE_GEMINI_LATENCY": "0.05",
+        "FAKE_GEMINI_TOKEN_DELAY": "0",
+        "FAKE_TTS_LATENCY": "0.05",
+        "FAKE_TTS_CHAR_DELAY": "0.0002",
+        # Measure the passthrough path, not the cache
+        "TTS_CACHE_MEMORY_BYTES": "0",
+        "TTS_CACHE_DIR": "",
+        "TTS_WARM_ON_STARTUP": "0",
+        "TRACE_LOG": "0",
+    }
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", accept, str(chars)],
+        env=env, cwd=tempfile.mkdtemp(), capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(sizes):
+    for chars in sizes:
+        print(f"narration of {chars} chars (~{chars * BYTES_PER_CHAR / 1e6:.1f} MB of mp3)")
+        baseline = None
+        for accept in FORMATS:
+            stats = run_child(accept, chars)
+            baseline = baseline or stats
+            print(f"  {accept:<20} wire {stats['wire_bytes'] / 1e6:7.2f} MB "
+                  f"({(stats['wire_bytes'] / baseline['wire_bytes'] - 1) * 100:+4.0f}%)   "
+                  f"first audio byte {stats['first_byte_ms']:7.1f} ms   "
+                  f"total {stats['total_ms']:7.1f} ms   peak RSS +{stats['peak_rss_growth_mb']:6.1f} MB")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        print(json.dumps(asyncio.run(measure(sys.argv[2], int(sys.argv[3])))))
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or [2000, 8000])
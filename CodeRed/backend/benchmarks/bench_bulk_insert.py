@@ -0,0 +1,74 @@
+# bench_bulk_insert.py
+"""
+Bulk ingestion throughput (rows/sec): the old add_all + unit-of-work flush
+versus BulkInserter's executemany batches, plus the NDJSON import endpoint.
+
+    python benchmarks/bench_bulk_insert.py [rows]
+"""
+import asyncio
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+import _env
+_env.bootstrap()
+
+from asgi_client import asgi_request  # noqa: E402
+from crud import food_row, insert_food_rows  # noqa: E402
+from database import FoodItemDB, SessionLocal  # noqa: E402
+from main import app  # noqa: E402
+from models import FoodItem  # noqa: E402
+
+
+def make_items(rows):
+    today = date.today()
+    return [FoodItem(name=f"item{i % 500}", quantity=i % 12 + 1,
+                     expiry_date=today + timedelta(days=i % 30), user_id=str(i % 100))
+            for i in range(rows)]
+
+
+def old_add_all(items):
+    with SessionLocal() as db:
+        db.add_all([FoodItemDB(name=item.name, quantity=item.quantity,
+                               expiry_date=item.expiry_date, user_id=item.user_id) for item in items])
+        db.commit()
+
+
+def batched(items, batch_size):
+    with SessionLocal() as db:
+        insert_food_rows(db, (food_row(item.name, item.quantity, item.expiry_date, item.user_id)
+                              for item in items), batch_size)
+        db.commit()
+
+
+def report(label, rows, seconds):
+    print(f"{label:<36} {rows / seconds:12,.0f} rows/sec   ({seconds * 1000:.0f} ms)")
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+async def ndjson_endpoint(items):
+    body = "\n".join(json.dumps({**item.dict(), "expiry_date": item.expiry_date.isoformat()})
+                     for item in items).encode("utf-8")
+    start = time.perf_counter()
+    result = await asgi_request(app, "POST", "/add_food_bulk_ndjson", body,
+                                headers={"content-type": "application/x-ndjson"})
+    assert result["status"] == 200, result["body"][:200]
+    return time.perf_counter() - start
+
+
+def main(rows):
+    items = make_items(rows)
+    report("add_all (previous implementation)", rows, timed(old_add_all, items))
+    for batch_size in (100, 1000, 10000):
+        report(f"executemany, batch_size={batch_size}", rows, timed(batched, items, batch_size))
+    report("POST /add_food_bulk_ndjson", rows, asyncio.run(ndjson_endpoint(items)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
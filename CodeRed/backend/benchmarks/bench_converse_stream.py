@@ -0,0 +1,52 @@
+# bench_converse_stream.py
+"""
+Time to first audio: /kitchen_converse (buffered JSON) vs /kitchen_converse_stream (SSE).
+Runs entirely offline against fake_providers.
+
+    python benchmarks/bench_converse_stream.py [runs]
+"""
+import asyncio
+import statistics
+import sys
+
+import _env
+# Every turn speaks the same canned reply
+_env.bootstrap(tts_cache=False)
+
+from asgi_client import asgi_request  # noqa: E402
+from main import app  # noqa: E402
+
+QUERY = {"user_query": "What can I cook with eggs and spinach?"}
+
+
+async def time_buffered():
+    result = await asgi_request(app, "POST", "/kitchen_converse", QUERY)
+    assert result["status"] == 200, result["body"][:200]
+    return result["elapsed"], result["elapsed"]
+
+
+async def time_streamed():
+    result = await asgi_request(app, "POST", "/kitchen_converse_stream", QUERY)
+    assert result["status"] == 200, result["body"][:200]
+    first_audio = next(t for t, chunk in result["chunks"] if chunk.startswith(b"event: audio"))
+    return first_audio, result["elapsed"]
+
+
+def report(name, samples):
+    first = [s[0] * 1000 for s in samples]
+    total = [s[1] * 1000 for s in samples]
+    print(f"{name:<10} first audio p50 {statistics.median(first):7.1f} ms   "
+          f"total p50 {statistics.median(total):7.1f} ms")
+    return statistics.median(first)
+
+
+async def main(runs):
+    buffered = [await time_buffered() for _ in range(runs)]
+    streamed = [await time_streamed() for _ in range(runs)]
+    before = report("buffered", buffered)
+    after = report("streamed", streamed)
+    print(f"time to first audio reduced by {(1 - after / before) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
@@ -0,0 +1,76 @@
+# bench_image_pipeline.py
+"""
+Image preprocessing for /scan_grocery_image on a synthetic 12MP phone photo:
+per-stage latency and bytes saved, then end-to-end scans (first upload vs a
+re-upload served from the perceptual-hash cache) against fake Gemini.
+
+    python benchmarks/bench_image_pipeline.py [max_edge]
+"""
+import asyncio
+import io
+import json
+import sys
+import time
+
+import _env
+_env.bootstrap()
+
+from PIL import Image, ImageFilter  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from image_pipeline import preprocess_image  # noqa: E402
+from main import app  # noqa: E402
+
+
+def phone_photo(width=4032, height=3024, quality=92):
+    """Noisy gradient so the JPEG is about as large as a real 12MP photo."""
+    noise = Image.effect_noise((width // 4, height // 4), 60).resize((width, height))
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.merge("RGB", (noise, gradient, noise.filter(ImageFilter.BLUR)))
+    exif = image.getexif()
+    exif[0x0112] = 6  # orientation: rotated 90 degrees, as phones store portrait shots
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=quality, exif=exif)
+    return out.getvalue()
+
+
+def multipart(image_bytes, boundary="benchboundary"):
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"shelf.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode("utf-8")
+    body = head + image_bytes + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, {"content-type": f"multipart/form-data; boundary={boundary}"}
+
+
+async def scan(image_bytes):
+    body, headers = multipart(image_bytes)
+    result = await asgi_request(app, "POST", "/scan_grocery_image", body, headers=headers)
+    assert result["status"] == 200, result["body"][:200]
+    return result
+
+
+def main(max_edge):
+    photo = phone_photo()
+    print(f"input: 4032x3024 JPEG, {len(photo) / 1024:.0f} KiB")
+
+    start = time.perf_counter()
+    full_decode = Image.open(io.BytesIO(photo))
+    full_decode.load()
+    print(f"full-resolution decode (what the old path handed to the SDK): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    for image_format in ("JPEG", "WEBP"):
+        prepared = preprocess_image(photo, max_edge=max_edge, image_format=image_format)
+        stats = prepared["stats"]
+        print(f"{image_format:<5} -> {stats['processed_size']} {stats['processed_bytes'] / 1024:7.0f} KiB "
+              f"(saved {stats['bytes_saved'] / len(photo):.0%})  decode {stats['decode_ms']:.1f} ms  "
+              f"resize {stats['resize_ms']:.1f} ms  hash {stats['hash_ms']:.1f} ms  encode {stats['encode_ms']:.1f} ms")
+
+    first = asyncio.run(scan(photo))
+    again = asyncio.run(scan(photo))
+    for label, result in (("first upload", first), ("re-upload", again)):
+        stats = json.loads(result["body"])["image_stats"]
+        print(f"{label:<13} end-to-end {result['elapsed'] * 1000:8.1f} ms   vision {stats['vision_ms']:8.1f} ms   "
+              f"cache_hit={stats['cache_hit']}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1600)
@@ -0,0 +1,168 @@
+# bench_inventory_digest.py
+"""
+Prompt inventory context: the old ", ".join of every row name versus the
+InventoryDigest (merged names, summed quantities, expiry order, token budget).
+
+For each inventory size, seeds one user's food_items in a throwaway SQLite
+file and reports the inventory text size, the whole kitchen-intent prompt
+size and the time to produce the text: old query + join, digest cold load
+(the startup build), an uncached render, a cached read and one incremental
+write. Then replays random adds/deletes/voice removals through the API and
+checks the maintained digest matches one rebuilt from the table, and that
+writes from another connection (as another worker would make) reach the next
+prompt.
+Runs entirely offline against fake_providers.
+
+    python benchmarks/bench_inventory_digest.py [rows ...]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+import _env
+_env.bootstrap(TRACE_LOG="0", FAKE_TTS_LATENCY="0", FAKE_TTS_CHAR_DELAY="0")
+
+from sqlalchemy import delete, insert, update  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from datagen import ingredient_names  # noqa: E402
+from database import FoodItemDB, SessionLocal, engine, make_engine  # noqa: E402
+from gemini_utils import build_kitchen_intent_prompt  # noqa: E402
+from inventory_digest import InventoryDigest, estimate_tokens  # noqa: E402
+
+NAMES = ["milk", "eggs", "bread", "spinach", "cheddar cheese", "apples", "bananas", "rice",
+         "chicken breast", "tomatoes", "onions", "garlic", "butter", "greek yogurt", "pasta",
+         "black beans", "carrots", "potatoes", "bell peppers", "lemons", "strawberries",
+         "ground beef", "salmon", "tofu", "oat milk", "cherries", "broccoli", "mushrooms",
+         "avocados", "cucumbers", "lettuce", "blueberries", "orange juice", "bacon", "ham",
+         "sourdough bread", "tortillas", "peanut butter", "honey", "cilantro", "basil",
+         "parmesan", "mozzarella", "sweet potatoes", "zucchini", "corn", "peas", "shrimp"]
+USER_ID = "1"
+QUERY = "What can I cook tonight?"
+
+
+def item_name(rng):
+    name = rng.choice(NAMES)
+    # The spellings people (and the vision model) actually produce for the same item
+    variant = rng.random()
+    if variant < 0.15 and name.endswith("s"):
+        if name.endswith("ies"):
+            return name[:-3] + "y"
+        return name[:-2] if name.endswith("oes") else name[:-1]
+    if variant < 0.25:
+        return name.title()
+    return name
+
+
+def seed(rows):
+    rng = random.Random(rows)
+    today = date.today()
+    with engine.begin() as conn:
+        conn.execute(delete(FoodItemDB))
+        conn.execute(insert(FoodItemDB), [{
+            "name": item_name(rng),
+            "quantity": rng.randint(1, 6),
+            "expiry_date": today + timedelta(days=rng.randint(-2, 60)) if rng.random() < 0.8 else None,
+            "user_id": USER_ID,
+        } for _ in range(rows)])
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def load_rows(db):
+    return db.query(FoodItemDB.user_id, FoodItemDB.name, FoodItemDB.quantity, FoodItemDB.expiry_date).all()
+
+
+def measure(rows):
+    seed(rows)
+    runs = 5 if rows >= 10_000 else 50
+    with SessionLocal() as db:
+        old_text, old_ms = timed(lambda: ", ".join(ingredient_names(db, USER_ID)), runs)
+        table_rows, query_ms = timed(lambda: load_rows(db), runs)
+
+    digest = InventoryDigest()
+    _, load_ms = timed(lambda: digest.load(table_rows), runs)
+    _, render_ms = timed(lambda: digest.text(USER_ID, token_budget=digest.token_budget), runs)
+    new_text, cached_ms = timed(lambda: digest.text(USER_ID), 1000)
+
+    def write_and_render():
+        digest.add(USER_ID, [("milk", 1, date.today())])
+        return digest.text(USER_ID)
+    _, write_ms = timed(write_and_render, runs)
+
+    old_prompt = build_kitchen_intent_prompt(QUERY, old_text)
+    new_prompt = build_kitchen_intent_prompt(QUERY, new_text)
+    print(f"{rows:>7} rows, {len(digest.entries(USER_ID))} distinct items")
+    print(f"  old join     inventory {len(old_text):>8} chars ~{estimate_tokens(old_text):>7} tokens   "
+          f"prompt ~{estimate_tokens(old_prompt):>7} tokens   query+join {old_ms:9.3f} ms")
+    print(f"  digest       inventory {len(new_text):>8} chars ~{estimate_tokens(new_text):>7} tokens   "
+          f"prompt ~{estimate_tokens(new_prompt):>7} tokens   cached     {cached_ms:9.4f} ms")
+    print(f"               startup: query {query_ms:.3f} ms + load {load_ms:.3f} ms   "
+          f"uncached render {render_ms:.3f} ms   write+render {write_ms:.3f} ms")
+
+
+async def check_incremental(operations):
+    import main
+
+    seed(200)
+    await main.startup_event()
+    rng = random.Random(7)
+    try:
+        for _ in range(operations):
+            op = rng.random()
+            if op < 0.5:
+                item = {"name": item_name(rng), "quantity": rng.randint(1, 4), "user_id": USER_ID,
+                        "expiry_date": (date.today() + timedelta(days=rng.randint(0, 20))).isoformat()}
+                result = await asgi_request(main.app, "POST", "/add_food", item)
+            elif op < 0.75:
+                with SessionLocal() as db:
+                    ids = [row.id for row in db.query(FoodItemDB.id).limit(50)]
+                result = await asgi_request(main.app, "DELETE", f"/delete_food/{rng.choice(ids)}")
+            else:
+                command = f"I used {rng.choice(['one', 'two', 'the'])} {rng.choice(NAMES)}"
+                result = await asgi_request(main.app, "POST", "/kitchen_converse", {"user_query": command},
+                                            headers={"accept": "audio/mpeg"}, keep_body=False)
+            assert result["status"] == 200, result["status"]
+    finally:
+        await main.shutdown_event()
+
+    rebuilt = InventoryDigest()
+    with SessionLocal() as db:
+        rebuilt.load(load_rows(db))
+    assert main.inventory_digest.entries(USER_ID) == rebuilt.entries(USER_ID), "digest drifted from food_items"
+    assert main.inventory_digest.text(USER_ID) == rebuilt.text(USER_ID)
+    print(f"incremental digest matches a full rebuild after {operations} API writes")
+
+    # Another worker's writes bypass this process's digest; the version check must catch them
+    other_worker = make_engine()
+    with other_worker.begin() as conn:
+        conn.execute(insert(FoodItemDB), [{"name": "dragon fruit", "quantity": 3, "expiry_date": None,
+                                           "user_id": USER_ID}])
+    assert "3 dragon fruit" in main.inventory_text(USER_ID), "digest missed another worker's insert"
+    with other_worker.begin() as conn:
+        conn.execute(update(FoodItemDB).where(FoodItemDB.name == "dragon fruit").values(quantity=1))
+    assert "3 dragon fruit" not in main.inventory_text(USER_ID), "digest missed another worker's update"
+    with other_worker.begin() as conn:
+        conn.execute(delete(FoodItemDB).where(FoodItemDB.name == "dragon fruit"))
+    assert "dragon fruit" not in main.inventory_text(USER_ID), "digest missed another worker's delete"
+    start = time.perf_counter()
+    for _ in range(1000):
+        main.inventory_text(USER_ID)
+    print(f"writes from another connection picked up; current-version check "
+          f"{(time.perf_counter() - start):.3f} ms per prompt")
+
+
+if __name__ == "__main__":
+    for rows in [int(arg) for arg in sys.argv[1:]] or [10, 100, 1_000, 10_000, 100_000]:
+        measure(rows)
+    asyncio.run(check_incremental(300))
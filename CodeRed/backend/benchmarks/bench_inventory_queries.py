@@ -0,0 +1,123 @@
+# bench_inventory_queries.py
+"""
+Inventory read paths on a large table: the old full-table ORM load versus
+user-scoped, indexed, column-only queries.
+
+Seeds ROWS food_items across USERS users into a throwaway SQLite file and
+reports p50/p99 per query.
+
+    python benchmarks/bench_inventory_queries.py [rows] [users]
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+import _env
+_env.bootstrap()
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from crud import inventory_page  # noqa: E402
+from datagen import ingredient_names  # noqa: E402
+from database import FoodItemDB, SessionLocal, engine  # noqa: E402
+from models import FoodItem  # noqa: E402
+
+NAMES = ["milk", "eggs", "bread", "spinach", "cheese", "apple", "banana", "rice",
+         "chicken", "tomato", "onion", "garlic", "butter", "yogurt", "pasta", "beans"]
+
+
+def seed(rows, users):
+    rng = random.Random(42)
+    today = date.today()
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            batch.append({
+                "name": rng.choice(NAMES),
+                "quantity": rng.randint(1, 12),
+                "expiry_date": today + timedelta(days=rng.randint(-5, 60)) if rng.random() < 0.9 else None,
+                "user_id": str(rng.randrange(users)),
+            })
+            if len(batch) == 50_000:
+                conn.execute(insert(FoodItemDB), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(FoodItemDB), batch)
+
+
+def set_composite_indexes(enabled):
+    with engine.begin() as conn:
+        for index in FoodItemDB.__table__.indexes:
+            if index.name.startswith("ix_food_items_user_"):
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    if enabled:
+        for index in FoodItemDB.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def measure(label, fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<44} p50 {statistics.median(samples):9.2f} ms   p99 {p99:9.2f} ms   ({runs} runs)")
+
+
+def old_inventory(db, user_id):
+    return [FoodItem(id=item.id, name=item.name, quantity=item.quantity,
+                     expiry_date=item.expiry_date, user_id=str(item.user_id))
+            for item in db.query(FoodItemDB).all()]
+
+
+def old_ingredient_list(db, user_id):
+    return ", ".join([item.name for item in db.query(FoodItemDB).all()])
+
+
+def new_inventory(db, user_id):
+    rows, _ = inventory_page(db, user_id)
+    return [FoodItem(id=row.id, name=row.name, quantity=row.quantity,
+                     expiry_date=row.expiry_date, user_id=str(row.user_id)) for row in rows]
+
+
+def new_inventory_page(db, user_id):
+    return inventory_page(db, user_id, limit=20)
+
+
+def new_ingredient_list(db, user_id):
+    return ", ".join(ingredient_names(db, user_id))
+
+
+def main(rows, users):
+    start = time.perf_counter()
+    seed(rows, users)
+    print(f"seeded {rows} rows across {users} users in {time.perf_counter() - start:.1f}s")
+    rng = random.Random(7)
+
+    def run(fn):
+        def call():
+            with SessionLocal() as db:
+                fn(db, str(rng.randrange(users)))
+        return call
+
+    full_runs = max(3, min(20, 1_000_000 // rows))  # full-table loads are slow
+    set_composite_indexes(False)
+    print("before (full table, ORM hydration, no composite indexes)")
+    measure("  /food_inventory", run(old_inventory), full_runs)
+    measure("  ingredient list", run(old_ingredient_list), full_runs)
+    measure("  user-scoped, no index (table scan)", run(new_ingredient_list), full_runs)
+
+    set_composite_indexes(True)
+    print("after (user-scoped, composite indexes, column projection)")
+    measure("  /food_inventory", run(new_inventory), 1000)
+    measure("  /food_inventory?limit=20", run(new_inventory_page), 1000)
+    measure("  ingredient list", run(new_ingredient_list), 1000)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10_000)
@@ -0,0 +1,106 @@
+# bench_local_intents.py
+"""
+Local intent fast-path against the labeled utterances in intent_utterances.jsonl.
+Each line has the text, the expected intent (add/remove/list/expiring, or
+"gemini" for anything that must go to the model) and, for add/remove, the
+expected [name, quantity] items (quantity null = "all of it").
+
+Reports classifier accuracy, fallback rate, wrong local answers (the costly
+error: a command Gemini should have handled), per-utterance classification
+latency and the end-to-end /kitchen_converse latency with and without the
+fast-path, against fake providers.
+
+    python benchmarks/bench_local_intents.py [-v]
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import _env
+_env.bootstrap(TRACE_LOG="0")
+os.environ.setdefault("FAKE_GEMINI_LATENCY", "0.4")
+os.environ.setdefault("FAKE_TTS_LATENCY", "0.05")
+os.environ.setdefault("FAKE_TTS_CHAR_DELAY", "0")
+
+import main  # noqa: E402
+from asgi_client import asgi_request  # noqa: E402
+from local_intents import classify_utterance  # noqa: E402
+
+UTTERANCES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_utterances.jsonl")
+
+
+def load_utterances():
+    with open(UTTERANCES) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def predicted(result):
+    if result is None:
+        return "gemini", []
+    items = [[item["name"], item["quantity"] if item["explicit_quantity"] or result["intent"] == "add" else None]
+             for item in result["items"]]
+    return result["intent"], items
+
+
+def check_classifier(utterances, verbose):
+    correct = fallbacks = wrong_local = missed_local = 0
+    latencies = []
+    for case in utterances:
+        start = time.perf_counter()
+        for _ in range(100):
+            result = classify_utterance(case["text"])
+        latencies.append((time.perf_counter() - start) / 100 * 1e6)
+
+        intent, items = predicted(result)
+        expected_items = case["items"]
+        ok = intent == case["intent"] and items == expected_items
+        correct += ok
+        fallbacks += intent == "gemini"
+        wrong_local += intent != "gemini" and not ok
+        missed_local += intent == "gemini" and case["intent"] != "gemini"
+        if verbose and not ok:
+            print(f"  MISS {case['text']!r}: expected {case['intent']} {expected_items}, got {intent} {items}")
+
+    total = len(utterances)
+    local_labeled = sum(case["intent"] != "gemini" for case in utterances)
+    latencies.sort()
+    print(f"{total} utterances ({local_labeled} answerable locally)")
+    print(f"accuracy            {correct / total * 100:5.1f}%")
+    print(f"fallback rate       {fallbacks / total * 100:5.1f}%  (labeled: {(total - local_labeled) / total * 100:.1f}%)")
+    print(f"wrong local answers {wrong_local:5d}")
+    print(f"missed local        {missed_local:5d}  (sent to Gemini although answerable)")
+    print(f"classify latency    p50 {statistics.median(latencies):6.1f} us   "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:6.1f} us")
+
+
+async def voice_turns(utterances, local):
+    main.LOCAL_INTENTS_ENABLED = local
+    latencies, sources = [], []
+    for case in utterances:
+        result = await asgi_request(main.app, "POST", "/kitchen_converse", {"user_query": case["text"]},
+                                    headers={"accept": "audio/mpeg"}, keep_body=False)
+        assert result["status"] == 200, (case["text"], result["status"])
+        latencies.append(result["elapsed"] * 1000)
+        sources.append(result["headers"].get("x-intent-source"))
+    gemini_calls = sources.count("gemini")
+    print(f"{'fast-path' if local else 'gemini only':<12} voice turn p50 {statistics.median(latencies):7.1f} ms   "
+          f"mean {statistics.mean(latencies):7.1f} ms   Gemini calls {gemini_calls}/{len(utterances)}")
+
+
+async def check_end_to_end(utterances):
+    await main.startup_event()
+    try:
+        main.add_items_by_name(next(main.get_db()), ["milk", "eggs", "bananas", "spinach"], main.DEFAULT_USER_ID)
+        await voice_turns(utterances, local=False)
+        await voice_turns(utterances, local=True)
+    finally:
+        await main.shutdown_event()
+
+
+if __name__ == "__main__":
+    utterances = load_utterances()
+    check_classifier(utterances, verbose="-v" in sys.argv)
+    asyncio.run(check_end_to_end(utterances))
@@ -0,0 +1,56 @@
+# bench_provider_concurrency.py
+"""
+Load test: do concurrent voice turns still serialize on the event loop?
+Starts the local stub servers, points the provider clients at them and
+fires N /kitchen_converse requests at once. With blocking provider calls
+the wall time grows ~N x a single turn; with the async pooled clients it
+stays close to one turn.
+
+    python benchmarks/bench_provider_concurrency.py [concurrency]
+"""
+import asyncio
+import os
+import sys
+import time
+
+import _env
+# Every turn speaks the same canned reply
+_env.bootstrap(fake_providers=False, tts_cache=False)
+
+from stub_servers import start_stub_server  # noqa: E402
+
+server, STUB_URL = start_stub_server()
+os.environ["GEMINI_BASE_URL"] = STUB_URL
+os.environ["ELEVENLABS_BASE_URL"] = STUB_URL
+
+from asgi_client import asgi_request  # noqa: E402
+from main import app  # noqa: E402
+from provider_clients import close_provider_clients  # noqa: E402
+
+QUERY = {"user_query": "What can I cook with eggs and spinach?"}
+
+
+async def one_turn():
+    result = await asgi_request(app, "POST", "/kitchen_converse", QUERY)
+    assert result["status"] == 200, result["body"][:200]
+    return result["elapsed"]
+
+
+async def main(concurrency):
+    await one_turn()  # warm up the connection pools
+    single = await one_turn()
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one_turn() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    await close_provider_clients()
+
+    print(f"single turn          {single * 1000:8.1f} ms")
+    print(f"{concurrency} concurrent turns  {wall * 1000:8.1f} ms wall, "
+          f"slowest {max(latencies) * 1000:.1f} ms")
+    print(f"serialization factor {wall / single:8.2f}  (1.0 = fully concurrent, {concurrency} = serialized)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 8))
+    server.shutdown()
@@ -0,0 +1,42 @@
+# bench_recipe_cache.py
+"""
+/generate_recipe with the inventory-digest keyed cache, against fake Gemini:
+cold miss, warm hit, many concurrent clients, and invalidation on write.
+
+    python benchmarks/bench_recipe_cache.py [clients]
+"""
+import asyncio
+import sys
+import time
+
+import _env
+_env.bootstrap()
+
+from asgi_client import asgi_request  # noqa: E402
+from main import app, recipe_cache, startup_event  # noqa: E402
+
+
+async def recipe():
+    result = await asgi_request(app, "GET", "/generate_recipe")
+    assert result["status"] == 200, result["body"][:200]
+    return result["elapsed"] * 1000, result["headers"].get("x-recipe-cache")
+
+
+async def main(clients):
+    await startup_event()
+    await asgi_request(app, "POST", "/add_food", {"name": "eggs", "quantity": 12, "user_id": "1"})
+
+    print("cold        %8.1f ms  (%s)" % await recipe())
+    print("warm        %8.1f ms  (%s)" % await recipe())
+
+    await asgi_request(app, "POST", "/add_food", {"name": "spinach", "quantity": 1, "user_id": "1"})
+    start = time.perf_counter()
+    results = await asyncio.gather(*(recipe() for _ in range(clients)))
+    statuses = [status for _, status in results]
+    print(f"{clients} concurrent after a write: {(time.perf_counter() - start) * 1000:.1f} ms wall, "
+          f"{statuses.count('miss')} model call(s), {statuses.count('collapsed')} collapsed")
+    print(recipe_cache.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
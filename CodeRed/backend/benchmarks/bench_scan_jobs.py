@@ -0,0 +1,81 @@
+# bench_scan_jobs.py
+"""
+Concurrent grocery-photo uploads against the fake vision model: inline
+/scan_grocery_image versus ?background=true with job polling.
+Reports how long clients hold their upload request open and the overall
+throughput; background jobs cap concurrent vision calls at JOB_MAX_CONCURRENT. Each upload is a distinct image so the perceptual-hash cache
+doesn't short-circuit the vision call.
+
+    python benchmarks/bench_scan_jobs.py [uploads]
+"""
+import asyncio
+import io
+import json
+import statistics
+import sys
+import time
+
+import _env
+_env.bootstrap()
+
+from PIL import Image  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from main import app, scan_jobs, shutdown_event, startup_event  # noqa: E402
+
+
+def distinct_photo(seed):
+    image = Image.effect_noise((640, 480), 40 + seed % 50).convert("RGB")
+    image = image.rotate(seed * 7)
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=85)
+    return out.getvalue()
+
+
+def multipart(image_bytes, boundary="benchboundary"):
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"shelf.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode("utf-8")
+    body = head + image_bytes + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, {"content-type": f"multipart/form-data; boundary={boundary}"}
+
+
+async def inline_upload(photo):
+    body, headers = multipart(photo)
+    result = await asgi_request(app, "POST", "/scan_grocery_image", body, headers=headers)
+    assert result["status"] == 200, result["body"][:200]
+    return result["elapsed"]
+
+
+async def background_upload(photo):
+    body, headers = multipart(photo)
+    result = await asgi_request(app, "POST", "/scan_grocery_image", body, headers=headers,
+                                query_string=b"background=true")
+    assert result["status"] == 202, result["body"][:200]
+    job_id = json.loads(result["body"])["job_id"]
+    while True:
+        status = json.loads((await asgi_request(app, "GET", f"/jobs/{job_id}"))["body"])
+        if status["status"] != "queued" and status["status"] != "running":
+            assert status["status"] == "done", status
+            return result["elapsed"]
+        await asyncio.sleep(0.05)
+
+
+async def run(label, upload, photos):
+    start = time.perf_counter()
+    held = await asyncio.gather(*(upload(photo) for photo in photos))
+    wall = time.perf_counter() - start
+    print(f"{label:<12} request held p50 {statistics.median(held) * 1000:8.1f} ms   "
+          f"all results in {wall * 1000:8.1f} ms   {len(photos) / wall:6.1f} scans/s")
+
+
+async def main(uploads):
+    await startup_event()
+    photos = [distinct_photo(i) for i in range(uploads * 2)]
+    await run("inline", inline_upload, photos[:uploads])
+    await run("background", background_upload, photos[uploads:])
+    print(scan_jobs.stats())
+    await shutdown_event()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,112 @@
+# bench_sqlite_concurrency.py
+"""
+Mixed read/write concurrency against SQLite under different storage settings.
+Worker threads run a voice/scan/bulk-like mix (mostly per-user reads, some
+small write transactions) and we report throughput, write latency and the
+rate of "database is locked" errors.
+
+    python benchmarks/bench_sqlite_concurrency.py [threads] [seconds] [write_ratio]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import _env
+_env.bootstrap()
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from crud import food_row, insert_food_rows  # noqa: E402
+from datagen import ingredient_names  # noqa: E402
+from database import POOL_SETTINGS, SQLITE_SETTINGS, Base, FoodItemDB, make_engine  # noqa: E402
+
+USERS = 200
+
+
+def previous_engine(url):
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+def tuned(**overrides):
+    return lambda url: make_engine(url, {**SQLITE_SETTINGS, **overrides}, POOL_SETTINGS)
+
+
+CONFIGS = [
+    ("previous: create_engine defaults", previous_engine),
+    ("rollback journal, FULL, no busy wait", tuned(journal_mode="DELETE", synchronous="FULL", busy_timeout=0)),
+    ("WAL, NORMAL, no busy wait", tuned(busy_timeout=0)),
+    ("WAL, FULL, busy_timeout=5s", tuned(synchronous="FULL")),
+    ("WAL, NORMAL, busy_timeout=5s (default)", tuned()),
+]
+
+
+def run_config(name, factory, threads, seconds, write_ratio):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = factory(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(FoodItemDB), [food_row(f"item{i % 50}", 1, None, str(i % USERS)) for i in range(20_000)])
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    stats = {"reads": 0, "writes": 0, "locked": 0}
+    write_latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            user_id = str(rng.randrange(USERS))
+            is_write = rng.random() < write_ratio
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    if is_write:
+                        insert_food_rows(db, [food_row("milk", 1, None, user_id) for _ in range(rng.randint(1, 20))])
+                        db.commit()
+                    else:
+                        ingredient_names(db, user_id)
+            except OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                with lock:
+                    stats["locked"] += 1
+                continue
+            with lock:
+                if is_write:
+                    stats["writes"] += 1
+                    write_latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    stats["reads"] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    engine.dispose()
+
+    attempts = stats["reads"] + stats["writes"] + stats["locked"]
+    write_latencies.sort()
+    p99 = write_latencies[int(len(write_latencies) * 0.99)] if write_latencies else 0.0
+    print(f"{name:<42} {stats['reads'] / seconds:8.0f} reads/s {stats['writes'] / seconds:7.0f} writes/s  "
+          f"write p50 {statistics.median(write_latencies or [0]):6.1f} ms p99 {p99:7.1f} ms  "
+          f"locked {stats['locked'] / max(attempts, 1) * 100:5.1f}%")
+
+
+def main(threads, seconds, write_ratio):
+    print(f"{threads} threads, {seconds}s per setting, {write_ratio:.0%} writes")
+    for name, factory in CONFIGS:
+        run_config(name, factory, threads, seconds, write_ratio)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 5,
+         float(sys.argv[3]) if len(sys.argv) > 3 else 0.3)
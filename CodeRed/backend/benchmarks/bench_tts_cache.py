@@ -0,0 +1,47 @@
+# bench_tts_cache.py
+"""
+TTS cache behaviour against the fake ElevenLabs backend:
+cold vs warm latency, request collapsing, and the resulting metrics.
+
+    python benchmarks/bench_tts_cache.py
+"""
+import asyncio
+import time
+
+import _env
+_env.bootstrap()  # fresh on-disk cache tier in the temp dir
+
+from elevenlabs_utils import (  # noqa: E402
+    DEFAULT_VOICE_ID, VOICE_SETTINGS, text_to_speech_elevenlabs, tts_cache, warm_tts_cache,
+)
+from gemini_utils import OFF_TOPIC_REPLY, NEXT_STEP_PHRASE  # noqa: E402
+from tts_cache import TTSCache, cache_key  # noqa: E402
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+
+async def main():
+    cold = await timed(text_to_speech_elevenlabs(OFF_TOPIC_REPLY))
+    warm = await timed(text_to_speech_elevenlabs("  " + OFF_TOPIC_REPLY.replace(" ", "   ") + "\n"))
+    print(f"cold miss      {cold:8.2f} ms")
+    print(f"memory hit     {warm:8.2f} ms  (whitespace-normalized key)")
+
+    # Drop the memory tier to measure the disk tier
+    disk_only = TTSCache(disk_dir=tts_cache.disk_dir)
+    key = cache_key(OFF_TOPIC_REPLY, DEFAULT_VOICE_ID, VOICE_SETTINGS)
+    print(f"disk hit       {await timed(disk_only.lookup(key)):8.2f} ms")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(text_to_speech_elevenlabs(NEXT_STEP_PHRASE) for _ in range(50)))
+    print(f"50 identical concurrent requests {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+    await warm_tts_cache([OFF_TOPIC_REPLY, NEXT_STEP_PHRASE])
+    print(tts_cache.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+# check_request_metrics.py
+"""
+Checks the per-request traces from metrics.py against fake providers:
+every instrumented stage shows up, the stage times add up to no more than
+the request total, /metrics exposes the series, and the instrumentation
+overhead per request (middleware, trace log, SQL timing) is measured against
+the same app without it, alternating the two request by request.
+
+    python benchmarks/check_request_metrics.py [overhead_runs]
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+import _env
+_env.bootstrap(tts_cache=False)
+
+from asgi_client import asgi_request  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from database import engine  # noqa: E402
+from main import TTS_STREAM_CONCURRENCY, app, startup_event, shutdown_event  # noqa: E402
+from metrics import ENGINE_EVENTS, MetricsMiddleware, TRACE_LOG, trace_handler, trace_logger  # noqa: E402
+
+# Timer resolution and the code between two stages; stages can't overlap,
+# so anything beyond this means double counting
+TOLERANCE_MS = 0.5
+
+
+class TraceCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.traces = []
+
+    def emit(self, record):
+        self.traces.append(json.loads(json.dumps(record.msg)))  # what the log line would hold
+
+
+CASES = [
+    ("POST", "/add_food", {"name": "eggs", "quantity": 12, "expiry_date": "2030-01-01", "user_id": "1"},
+     {"db"}),
+    ("GET", "/food_inventory", b"", {"db"}),
+    # Prompt building reads the digest after one inventory_versions lookup (the "db" stage)
+    ("GET", "/generate_recipe", b"", {"db", "llm"}),
+    # A question goes to Gemini; "I bought milk" is answered locally (SQL, no model call)
+    ("POST", "/kitchen_converse", {"user_query": "What can I cook tonight?"}, {"db", "llm", "tts", "encode"}),
+    ("POST", "/kitchen_converse", {"user_query": "I bought milk"}, {"db", "tts", "encode"}),
+    ("POST", "/kitchen_converse_stream", {"user_query": "What can I cook?"}, {"db", "llm", "tts", "encode"}),
+]
+
+# Gemini and TTS run side by side on the stream, so their sum isn't bounded by the total
+OVERLAPPING = {"/kitchen_converse_stream"}
+
+
+async def check_traces(collector):
+    if not TRACE_LOG:
+        print("TRACE_LOG=0: trace checks skipped")
+        return
+    for method, path, body, expected_stages in CASES:
+        collector.traces.clear()
+        result = await asgi_request(app, method, path, body, headers={"x-request-id": f"check-{path}"})
+        assert result["status"] == 200, (path, result["body"][:200])
+        assert result["headers"].get("x-request-id") == f"check-{path}", path
+        trace = next(t for t in collector.traces if t["request_id"] == f"check-{path}")
+
+        staged = sum(trace["stages_ms"].values())
+        missing = expected_stages - set(trace["stages_ms"])
+        assert not missing, f"{path}: no timing for {missing}"
+        if path in OVERLAPPING:
+            # One Gemini stream, but up to TTS_STREAM_CONCURRENCY sentences synthesized at once
+            for stage, ms in trace["stages_ms"].items():
+                bound = trace["total_ms"] * (TTS_STREAM_CONCURRENCY if stage == "tts" else 1) + TOLERANCE_MS
+                assert ms <= bound, f"{path}: {stage} {ms:.3f} ms > {bound:.3f} ms"
+        else:
+            assert staged <= trace["total_ms"] + TOLERANCE_MS, f"{path}: stages {staged:.3f} ms > total {trace['total_ms']} ms"
+            assert abs(staged + trace["other_ms"] - trace["total_ms"]) <= TOLERANCE_MS, path
+        stages = "  ".join(f"{stage} {ms:7.2f}" for stage, ms in sorted(trace["stages_ms"].items()))
+        print(f"{path:<26} total {trace['total_ms']:8.2f} ms = {stages}  other {trace['other_ms']:6.2f}")
+
+    result = await asgi_request(app, "GET", "/metrics")
+    text = result["body"].decode("utf-8")
+    for series in ('codered_stage_duration_seconds_count{endpoint="/kitchen_converse",stage="llm",model="gemini-2.5-flash"}',
+                   'codered_request_duration_seconds_bucket{endpoint="/food_inventory",method="GET",status="200",le="+Inf"}',
+                   'codered_response_bytes_total{endpoint="/kitchen_converse"}',
+                   'codered_provider_bytes_total{provider="ElevenLabs",direction="received"}'):
+        assert series in text, f"/metrics is missing {series}"
+    print(f"/metrics: {len(text.splitlines())} lines, all expected series present")
+
+
+def set_instrumented(on, stacks):
+    app.middleware_stack = stacks[on]
+    for name, listener in ENGINE_EVENTS:
+        if on and not event.contains(engine, name, listener):
+            event.listen(engine, name, listener)
+        elif not on and event.contains(engine, name, listener):
+            event.remove(engine, name, listener)
+
+
+async def measure_overhead(runs, production_handlers):
+    # The production path: queued trace lines written by the listener thread, to nowhere
+    trace_logger.handlers = production_handlers
+    trace_handler.setStream(open(os.devnull, "w"))
+    instrumented = app.build_middleware_stack()
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not MetricsMiddleware]
+    stacks = {True: instrumented, False: app.build_middleware_stack()}
+
+    samples = {True: [], False: []}
+    for _ in range(runs):
+        # Alternate in random order so drift and warm caches affect both sides equally
+        for on in random.sample((True, False), 2):
+            set_instrumented(on, stacks)
+            start = time.perf_counter()
+            await asgi_request(app, "GET", "/food_inventory", query_string=b"limit=20")
+            samples[on].append(time.perf_counter() - start)
+    set_instrumented(True, stacks)
+    before = statistics.median(samples[False]) * 1e6
+    after = statistics.median(samples[True]) * 1e6
+    print(f"/food_inventory?limit=20 p50 over {runs} pairs: bare {before:.0f} us, instrumented {after:.0f} us "
+          f"(overhead {after - before:+.0f} us, {(after / before - 1) * 100:+.1f}%)")
+
+
+async def main(runs):
+    collector = TraceCollector()
+    production_handlers = trace_logger.handlers
+    trace_logger.handlers = [collector]
+    await startup_event()
+    try:
+        await check_traces(collector)
+        for i in range(200):
+            await asgi_request(app, "POST", "/add_food", {"name": f"item {i}", "quantity": 1, "user_id": "1"})
+        await measure_overhead(runs, production_handlers)
+    finally:
+        await shutdown_event()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,105 @@
+# datagen.py
+"""
+Synthetic food_items for the benchmarks and load tests: a realistic grocery
+vocabulary (with the plural/capitalized spellings people and the vision model
+produce), quantities, expiry dates spread from a few days past to two months
+ahead, some undated rows, spread over users "1".."N". Deterministic per seed.
+
+Seeds the database at DATABASE_URL, or writes an NDJSON file for
+/add_food_bulk_ndjson. ingredient_names is the old prompt-building read
+(every row name), kept here as the baseline the benchmarks compare against:
+
+    python benchmarks/datagen.py rows [--users 50] [--seed 0] [--ndjson out.ndjson]
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+import _env  # noqa: F401  (puts the backend on sys.path)
+
+GROCERIES = [
+    "milk", "eggs", "bread", "spinach", "cheddar cheese", "apples", "bananas", "rice",
+    "chicken breast", "tomatoes", "onions", "garlic", "butter", "greek yogurt", "pasta",
+    "black beans", "carrots", "potatoes", "bell peppers", "lemons", "strawberries",
+    "ground beef", "salmon", "tofu", "oat milk", "cherries", "broccoli", "mushrooms",
+    "avocados", "cucumbers", "lettuce", "blueberries", "orange juice", "bacon", "ham",
+    "sourdough bread", "tortillas", "peanut butter", "honey", "cilantro", "basil",
+    "parmesan", "mozzarella", "sweet potatoes", "zucchini", "corn", "peas", "shrimp",
+    "flour", "sugar", "olive oil", "soy sauce", "ketchup", "mayonnaise", "cereal",
+    "oats", "almonds", "chickpeas", "lentils", "coconut milk", "ginger", "limes",
+]
+
+
+def grocery_name(rng):
+    name = rng.choice(GROCERIES)
+    variant = rng.random()
+    if variant < 0.1 and name.endswith("s"):
+        if name.endswith("ies"):
+            return name[:-3] + "y"
+        return name[:-2] if name.endswith("oes") else name[:-1]
+    if variant < 0.2:
+        return name.title()
+    return name
+
+
+def food_items(rows, users=1, seed=0, dated_fraction=0.8, today=None):
+    """Yield `rows` FoodItem-shaped dicts (no id) for users "1".."users"."""
+    rng = random.Random(seed)
+    today = today or date.today()
+    for _ in range(rows):
+        dated = rng.random() < dated_fraction
+        yield {
+            "name": grocery_name(rng),
+            "quantity": rng.choice((1, 1, 1, 2, 2, 3, 4, 6, 12)),
+            "expiry_date": today + timedelta(days=rng.randint(-3, 60)) if dated else None,
+            "user_id": str(rng.randint(1, users)),
+        }
+
+
+def ndjson_body(rows, users=1, seed=0):
+    """/add_food_bulk_ndjson request body."""
+    lines = []
+    for item in food_items(rows, users, seed):
+        expiry = item["expiry_date"]
+        lines.append(json.dumps({**item, "expiry_date": expiry.isoformat() if expiry else None}))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def seed_database(rows, users=1, seed=0):
+    """Insert rows into the database at DATABASE_URL; returns how many."""
+    from crud import food_row, insert_food_rows
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        ids = insert_food_rows(db, (food_row(**item) for item in food_items(rows, users, seed)))
+        db.commit()
+    return len(ids)
+
+
+def ingredient_names(db, user_id):
+    """Names in a user's inventory, via ix_food_items_user_name."""
+    from sqlalchemy import select
+
+    from database import FoodItemDB
+
+    return db.execute(
+        select(FoodItemDB.name).where(FoodItemDB.user_id == user_id)
+    ).scalars().all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic food_items")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ndjson", help="write an NDJSON import file instead of seeding the database")
+    args = parser.parse_args()
+
+    if args.ndjson:
+        with open(args.ndjson, "wb") as f:
+            f.write(ndjson_body(args.rows, args.users, args.seed))
+        print(f"📦 Wrote {args.rows} items for {args.users} users to {args.ndjson}")
+    else:
+        count = seed_database(args.rows, args.users, args.seed)
+        print(f"📦 Inserted {count} items for {args.users} users")
@@ -0,0 +1,352 @@
+# loadtest.py
+"""
+Load-test scenarios for the backend with Gemini and ElevenLabs replaced by
+stub_servers.py, so runs are reproducible and cost no API credits.
+
+Each scenario runs in a fresh process against a throwaway SQLite database
+seeded by datagen.py. `concurrency` clients drive the app in-process (through
+asgi_client, so the web server itself isn't measured) for `duration` seconds.
+The stub server runs in its own process, over real sockets, so the provider
+connection pools are exercised and the stub's memory isn't counted.
+
+Scenarios:
+  inventory    paged GET /food_inventory for random users
+  bulk_import  POST /add_food_bulk_ndjson of --bulk-rows items
+  voice        POST /kitchen_converse with the utterances in intent_utterances.jsonl
+  image_scan   POST /scan_grocery_image, cycling through --photos distinct photos
+               (repeats hit the perceptual-hash cache, like real re-scans)
+  mixed        all of the above plus single adds and recipes, weighted as in MIXED
+
+Reports throughput, latency percentiles (overall and per operation), errors
+and RSS, and writes everything to a JSON file (default
+benchmarks/results/loadtest-<commit>.json) for comparison across commits:
+
+    python benchmarks/loadtest.py [scenario ...] [--concurrency 8] [--duration 10]
+        [--baseline results/loadtest-abc1234.json] [--gemini-latency 0.4 ...]
+    python benchmarks/loadtest.py compare old.json new.json
+"""
+import argparse
+import asyncio
+import gc
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from _env import BACKEND_DIR, BENCH_DIR
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+UTTERANCES = os.path.join(BENCH_DIR, "intent_utterances.jsonl")
+
+# Operation weights per scenario
+MIXED = {"inventory": 50, "voice": 25, "add_food": 10, "recipe": 6, "image_scan": 5, "bulk_import": 4}
+SCENARIOS = {
+    "inventory": {"inventory": 1},
+    "bulk_import": {"bulk_import": 1},
+    "voice": {"voice": 1},
+    "image_scan": {"image_scan": 1},
+    "mixed": MIXED,
+}
+
+
+# --- client side (runs in the scenario process) ---
+
+def distinct_photo(seed):
+    from PIL import Image
+
+    image = Image.effect_noise((640, 480), 40 + seed % 50).convert("RGB").rotate(seed * 7)
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=85)
+    return out.getvalue()
+
+
+def multipart(image_bytes, boundary="loadtestboundary"):
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"shelf.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode("utf-8")
+    body = head + image_bytes + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, {"content-type": f"multipart/form-data; boundary={boundary}"}
+
+
+class Client:
+    """One operation per method; each returns the asgi_request result."""
+
+    def __init__(self, app, config, rng):
+        from datagen import food_items, ndjson_body
+
+        self.app = app
+        self.config = config
+        self.rng = rng
+        self.cursors = {}
+        self.photo_index = 0
+        self.new_items = food_items(10 ** 9, config["users"], seed=rng.random())
+        kinds = SCENARIOS[config["scenario"]]
+        self.bulk_bodies = ([ndjson_body(config["bulk_rows"], config["users"], seed=1000 + i) for i in range(4)]
+                            if "bulk_import" in kinds else [])
+        self.photos = [multipart(distinct_photo(i)) for i in range(config["photos"])] if "image_scan" in kinds else []
+        with open(UTTERANCES) as f:
+            self.utterances = [json.loads(line)["text"] for line in f if line.strip()]
+
+    def user(self):
+        return str(self.rng.randint(1, self.config["users"]))
+
+    async def request(self, method, path, body=b"", headers=None, query=""):
+        from asgi_client import asgi_request
+        return await asgi_request(self.app, method, path, body, headers=headers,
+                                  query_string=query.encode("ascii"), keep_body=False)
+
+    async def inventory(self):
+        user = self.user()
+        after = self.cursors.pop(user, None)
+        result = await self.request("GET", "/food_inventory",
+                                    query=f"user_id={user}&limit=50" + (f"&after={after}" if after else ""))
+        if result["headers"].get("x-next-cursor"):
+            self.cursors[user] = result["headers"]["x-next-cursor"]
+        return result
+
+    async def add_food(self):
+        item = next(self.new_items)
+        expiry = item["expiry_date"]
+        return await self.request("POST", "/add_food", {**item, "expiry_date": expiry.isoformat() if expiry else None})
+
+    async def bulk_import(self):
+        return await self.request("POST", "/add_food_bulk_ndjson", self.rng.choice(self.bulk_bodies),
+                                  headers={"content-type": "application/x-ndjson"})
+
+    async def voice(self):
+        return await self.request("POST", "/kitchen_converse",
+                                  {"user_query": self.rng.choice(self.utterances), "user_id": self.user()},
+                                  headers={"accept": "multipart/form-data"})
+
+    async def recipe(self):
+        return await self.request("GET", "/generate_recipe", query=f"user_id={self.user()}")
+
+    async def image_scan(self):
+        body, headers = self.photos[self.photo_index % len(self.photos)]
+        self.photo_index += 1
+        return await self.request("POST", "/scan_grocery_image", body, headers=headers)
+
+
+def current_rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024
+
+
+def latency_summary(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2)
+    return {"p50": percentile(0.5), "p90": percentile(0.9), "p99": percentile(0.99),
+            "max": round(samples[-1], 2), "mean": round(statistics.mean(samples), 2)}
+
+
+async def run_scenario(config):
+    from datagen import seed_database
+    import main
+
+    seed_database(config["rows"], config["users"], seed=config["seed"])
+    await main.startup_event()
+    try:
+        client = Client(main.app, config, random.Random(config["seed"]))
+        kinds, weights = zip(*SCENARIOS[config["scenario"]].items())
+        for kind in kinds:  # warm imports, pools and caches outside the measurement
+            await getattr(client, kind)()
+        gc.collect()
+        rss_start = current_rss_mb()
+
+        samples = {kind: [] for kind in kinds}
+        errors = {kind: 0 for kind in kinds}
+        deadline = time.perf_counter() + config["duration"]
+
+        async def worker(seed):
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                kind = rng.choices(kinds, weights)[0]
+                start = time.perf_counter()
+                try:
+                    status = (await getattr(client, kind)())["status"]
+                except Exception as e:
+                    print(f"❌ {kind}: {e!r}")
+                    status = 599
+                samples[kind].append((time.perf_counter() - start) * 1000)
+                errors[kind] += status >= 400
+
+        peak_rss = rss_start
+
+        async def sample_rss():
+            # ru_maxrss would include seeding and startup, so sample the measured window instead
+            nonlocal peak_rss
+            while True:
+                peak_rss = max(peak_rss, current_rss_mb())
+                await asyncio.sleep(0.05)
+
+        sampler = asyncio.create_task(sample_rss())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(config["concurrency"])))
+        wall = time.perf_counter() - start
+        sampler.cancel()
+    finally:
+        await main.shutdown_event()
+
+    every = [sample for kind in kinds for sample in samples[kind]]
+    return {
+        "ops": len(every),
+        "errors": sum(errors.values()),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(every) / wall, 2),
+        "latency_ms": latency_summary(every),
+        "by_operation": {kind: {"ops": len(samples[kind]), "errors": errors[kind],
+                                "latency_ms": latency_summary(samples[kind])} for kind in kinds},
+        "memory_mb": {"rss_start": round(rss_start, 1), "rss_end": round(current_rss_mb(), 1),
+                      "peak_rss": round(peak_rss, 1), "peak_growth": round(max(peak_rss - rss_start, 0), 1)},
+    }
+
+
+# --- orchestration (parent process) ---
+
+def start_stub(stub_args):
+    process = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "stub_servers.py"), "0", *stub_args],
+                               stdout=subprocess.PIPE, text=True)
+    url = process.stdout.readline().strip().rsplit(" ", 1)[-1]
+    return process, url
+
+
+def run_child(config, stub_url):
+    env = {
+        **os.environ,
+        "GEMINI_BASE_URL": stub_url,
+        "ELEVENLABS_BASE_URL": stub_url,
+        "GEMINI_API_KEY": "loadtest",
+        "ELEVENLABS_API_KEY": "loadtest",
+        "TTS_WARM_ON_STARTUP": "0",
+        "TRACE_LOG": "0",
+    }
+    env.pop("FAKE_PROVIDERS", None)
+    env.pop("DATABASE_URL", None)  # the child's fresh temp directory holds its database
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", json.dumps(config)],
+        env=env, cwd=tempfile.mkdtemp(), capture_output=True, text=True,
+    )
+    if output.returncode:
+        raise RuntimeError(f"{config['scenario']} failed:\n{output.stderr[-2000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        return git("rev-parse", "HEAD") or "unknown", bool(git("status", "--porcelain", "--", "."))
+    except OSError:
+        return "unknown", False
+
+
+def print_scenario(name, stats):
+    latency, memory = stats["latency_ms"], stats["memory_mb"]
+    print(f"{name:<12} {stats['throughput_rps']:8.1f} req/s   p50 {latency['p50']:8.1f}   p90 {latency['p90']:8.1f}   "
+          f"p99 {latency['p99']:8.1f} ms   errors {stats['errors']}/{stats['ops']}   "
+          f"RSS {memory['rss_start']:.0f} MB, peak +{memory['peak_growth']:.1f} MB")
+    if len(stats["by_operation"]) > 1:
+        for kind, op in stats["by_operation"].items():
+            print(f"  {kind:<12} {op['ops']:6d} ops   p50 {op['latency_ms'].get('p50', 0):8.1f}   "
+                  f"p99 {op['latency_ms'].get('p99', 0):8.1f} ms   errors {op['errors']}")
+
+
+def compare(old, new):
+    """Print the change in throughput, latency and memory for scenarios present in both runs."""
+    print(f"{'':<12} {old['commit'][:7]} -> {new['commit'][:7]}{' (dirty)' if new.get('dirty') else ''}")
+    old_config, new_config = {**old["config"], **old["config"]["stub"]}, {**new["config"], **new["config"]["stub"]}
+    differing = sorted(key for key in new_config if key != "stub" and old_config.get(key) != new_config[key])
+    if differing:
+        print(f"⚠️  runs used different settings: {', '.join(differing)}")
+
+    def change(before, after):
+        return f"{after:9.1f} ({(after / before - 1) * 100 if before else 0:+6.1f}%)"
+    for name, stats in new["scenarios"].items():
+        if name not in old["scenarios"]:
+            continue
+        before = old["scenarios"][name]
+        print(f"{name:<12} req/s {change(before['throughput_rps'], stats['throughput_rps'])}   "
+              f"p50 {change(before['latency_ms']['p50'], stats['latency_ms']['p50'])}   "
+              f"p99 {change(before['latency_ms']['p99'], stats['latency_ms']['p99'])}   "
+              f"peak MB {change(before['memory_mb']['peak_growth'], stats['memory_mb']['peak_growth'])}")
+
+
+def parse_args(argv):
+    from stub_servers import SETTINGS, parse_args as parse_stub_args
+
+    stub_defaults = parse_stub_args([])
+    parser = argparse.ArgumentParser(description="Backend load tests against stub providers")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--rows", type=int, default=20_000, help="food_items seeded before each scenario")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--bulk-rows", type=int, default=500, help="items per bulk import")
+    parser.add_argument("--photos", type=int, default=50, help="distinct photos for image scans")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="results file (default benchmarks/results/loadtest-<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    for flag, (_, kind) in SETTINGS.items():
+        parser.add_argument(f"--{flag.replace('_', '-')}", type=kind, default=getattr(stub_defaults, flag))
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.stub = {flag: getattr(args, flag) for flag in SETTINGS}
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    stub_args = [str(part) for flag, value in args.stub.items() for part in (f"--{flag.replace('_', '-')}", value)]
+    commit, dirty = git_revision()
+    config = {"concurrency": args.concurrency, "duration": args.duration, "rows": args.rows, "users": args.users,
+              "bulk_rows": args.bulk_rows, "photos": args.photos, "seed": args.seed}
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {**config, "stub": args.stub},
+        "scenarios": {},
+    }
+
+    stub, stub_url = start_stub(stub_args)
+    try:
+        for name in args.scenarios or list(SCENARIOS):
+            results["scenarios"][name] = stats = run_child({**config, "scenario": name}, stub_url)
+            print_scenario(name, stats)
+    finally:
+        stub.terminate()
+
+    out = args.out or os.path.join(RESULTS_DIR, f"loadtest-{commit[:7]}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"📄 Results written to {out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        print(json.dumps(asyncio.run(run_scenario(json.loads(sys.argv[2])))))
+    elif sys.argv[1:2] == ["compare"]:
+        with open(sys.argv[2]) as old, open(sys.argv[3]) as new:
+            compare(json.load(old), json.load(new))
+    else:
+        main(sys.argv[1:])
@@ -0,0 +1,112 @@
+# stub_servers.py
+"""
+Real-socket stub of the Gemini and ElevenLabs HTTP APIs, serving the same
+canned payloads and latencies as fake_providers. Point GEMINI_BASE_URL and
+ELEVENLABS_BASE_URL at it to exercise the real connection pools.
+Latency and payload size come from the FAKE_* environment variables or the
+matching flags; port 0 picks a free port (the URL is printed on startup).
+
+    python benchmarks/stub_servers.py [port] [--gemini-latency 0.4] [--tts-bytes-per-char 400] ...
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import _env  # noqa: F401  (puts the backend on sys.path)
+
+import fake_providers as fake  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients can reuse connections
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunked(self, content_type, chunks, first_delay, chunk_delay):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(first_delay)
+        for chunk in chunks:
+            self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            self.wfile.flush()
+            time.sleep(chunk_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if path.startswith("/v1beta/models/"):
+            text = fake.gemini_reply_for(payload)
+            if path.endswith(":streamGenerateContent"):
+                events = [fake.gemini_sse_event(chunk) for chunk in fake.gemini_chunks(text)]
+                return self._send_chunked("text/event-stream", events,
+                                          fake.FAKE_GEMINI_LATENCY, fake.FAKE_GEMINI_TOKEN_DELAY)
+            time.sleep(fake.gemini_total_delay(text))
+            body = json.dumps(fake.gemini_response_body(text)).encode("utf-8")
+            return self._send(200, "application/json", body)
+
+        if path.startswith("/v1/text-to-speech/"):
+            text = payload.get("text", "")
+            if path.endswith("/stream"):
+                return self._send_chunked("audio/mpeg", fake.fake_audio_chunks(text),
+                                          fake.FAKE_TTS_LATENCY, fake.tts_chunk_delay(text))
+            time.sleep(fake.FAKE_TTS_LATENCY + fake.FAKE_TTS_CHAR_DELAY * len(text))
+            return self._send(200, "audio/mpeg", fake.fake_audio_for(text))
+
+        self._send(404, "application/json", b'{"error": "unknown stub endpoint"}')
+
+
+def start_stub_server(port=0):
+    """Start the stub in a daemon thread and return (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# flag -> fake_providers setting it overrides
+SETTINGS = {
+    "gemini_latency": ("FAKE_GEMINI_LATENCY", float),
+    "gemini_token_delay": ("FAKE_GEMINI_TOKEN_DELAY", float),
+    "gemini_reply_chars": ("FAKE_GEMINI_REPLY_CHARS", int),
+    "vision_items": ("FAKE_VISION_ITEMS", int),
+    "tts_latency": ("FAKE_TTS_LATENCY", float),
+    "tts_char_delay": ("FAKE_TTS_CHAR_DELAY", float),
+    "tts_bytes_per_char": ("FAKE_TTS_BYTES_PER_CHAR", int),
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Stub Gemini/ElevenLabs HTTP server")
+    parser.add_argument("port", nargs="?", type=int, default=8900)
+    for flag, (setting, kind) in SETTINGS.items():
+        parser.add_argument(f"--{flag.replace('_', '-')}", type=kind, default=getattr(fake, setting))
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    for flag, (setting, _) in SETTINGS.items():
+        setattr(fake, setting, getattr(args, flag))
+    server, url = start_stub_server(args.port)
+    print(f"Stub Gemini/ElevenLabs listening on {url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,189 @@
+# crud.py
+"""
+User-scoped inventory queries, backed by the composite indexes on food_items.
+They select plain columns instead of hydrating FoodItemDB objects.
+Bulk writes go through BulkInserter (Core insert, executemany per batch).
+"""
+import os
+from datetime import date, timedelta
+
+from sqlalchemy import and_, delete, func, insert, or_, select, text, tuple_, update
+
+from database import FoodItemDB
+
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "1000"))
+
+INVENTORY_COLUMNS = (
+    FoodItemDB.id,
+    FoodItemDB.name,
+    FoodItemDB.quantity,
+    FoodItemDB.expiry_date,
+    FoodItemDB.user_id,
+)
+
+
+def encode_cursor(row):
+    expiry = row.expiry_date.isoformat() if row.expiry_date else ""
+    return f"{expiry}_{row.id}"
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    expiry, _, last_id = cursor.rpartition("_")
+    return (date.fromisoformat(expiry) if expiry else None), int(last_id)
+
+
+def inventory_page(db, user_id, limit=None, after=None):
+    """
+    One page of a user's inventory in (expiry_date, id) order, the order of
+    ix_food_items_user_expiry, so soonest-expiring items come first. Items
+    without an expiry date come before dated ones; NULLS FIRST is spelled out
+    because databases disagree on the default (SQLite: first, Postgres: last)
+    and the cursor predicates below depend on it.
+    `after` is the cursor returned with the previous page.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    query = select(*INVENTORY_COLUMNS).where(FoodItemDB.user_id == user_id)
+    if after:
+        expiry, last_id = decode_cursor(after)
+        if expiry is None:
+            query = query.where(or_(
+                FoodItemDB.expiry_date.isnot(None),
+                and_(FoodItemDB.expiry_date.is_(None), FoodItemDB.id > last_id),
+            ))
+        else:
+            query = query.where(FoodItemDB.expiry_date.isnot(None),
+                                tuple_(FoodItemDB.expiry_date, FoodItemDB.id) > tuple_(expiry, last_id))
+    query = query.order_by(FoodItemDB.expiry_date.nullsfirst(), FoodItemDB.id)
+    if limit:
+        query = query.limit(limit)
+
+    rows = db.execute(query).all()
+    next_cursor = encode_cursor(rows[-1]) if limit and len(rows) == limit else None
+    return rows, next_cursor
+
+
+def food_row(name, quantity=1, expiry_date=None, user_id="1"):
+    """Column dict for BulkInserter; tolerates the loose values Gemini returns."""
+    if isinstance(expiry_date, str):
+        try:
+            expiry_date = date.fromisoformat(expiry_date.strip())
+        except ValueError:
+            expiry_date = None
+    return {
+        "name": str(name),
+        "quantity": int(quantity) if quantity is not None else 1,
+        "expiry_date": expiry_date,
+        "user_id": str(user_id),
+    }
+
+
+class BulkInserter:
+    """
+    Buffers food_row dicts and writes each batch_size rows with a single
+    executemany, inside the session's transaction (the caller commits).
+    Only the generated ids are kept, never the inserted objects.
+    """
+
+    def __init__(self, db, batch_size=BULK_INSERT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.ids = []
+        self._pending = []
+
+    def add(self, row):
+        """Queue a row; returns True once a full batch is waiting for flush()."""
+        self._pending.append(row)
+        return len(self._pending) >= self.batch_size
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        table = FoodItemDB.__table__
+        if self.db.get_bind().dialect.name == "sqlite":
+            # No RETURNING for executemany here. Inside one write transaction
+            # SQLite hands out consecutive rowids, so the batch ends at last_insert_rowid()
+            self.db.execute(insert(table), batch)
+            last_id = self.db.execute(text("SELECT last_insert_rowid()")).scalar()
+            self.ids.extend(range(last_id - len(batch) + 1, last_id + 1))
+        else:
+            result = self.db.execute(insert(table).values(batch).returning(table.c.id))
+            self.ids.extend(result.scalars())
+
+
+def insert_food_rows(db, rows, batch_size=BULK_INSERT_BATCH_SIZE):
+    """Insert an iterable of food_row dicts in batches; returns the new ids."""
+    inserter = BulkInserter(db, batch_size)
+    for row in rows:
+        if inserter.add(row):
+            inserter.flush()
+    inserter.flush()
+    return inserter.ids
+
+
+def name_variants(name):
+    """Lowercased name with naive singular/plural forms, so "banana" also matches "bananas"."""
+    name = " ".join(str(name).lower().split())
+    variants = {name, name + "s", name + "es"}
+    if name.endswith("ies"):
+        variants.add(name[:-3] + "y")
+    elif name.endswith("es"):
+        variants.update({name[:-2], name[:-1]})
+    elif name.endswith("s") and not name.endswith("ss"):
+        variants.add(name[:-1])
+    if name.endswith("y"):
+        variants.add(name[:-1] + "ies")
+    return variants
+
+
+def remove_food_by_name(db, user_id, name, quantity=None):
+    """
+    Take `quantity` units of an item out of a user's inventory, soonest-expiring
+    rows first (undated rows last); quantity=None removes every matching row.
+    Rows that reach zero are deleted. Returns (units removed, [(name, units,
+    expiry_date)] taken per row). The caller commits.
+    """
+    table = FoodItemDB.__table__
+    rows = db.execute(
+        select(FoodItemDB.id, FoodItemDB.name, FoodItemDB.quantity, FoodItemDB.expiry_date)
+        .where(FoodItemDB.user_id == user_id, func.lower(FoodItemDB.name).in_(name_variants(name)))
+        .order_by(FoodItemDB.expiry_date.is_(None), FoodItemDB.expiry_date, FoodItemDB.id)
+    ).all()
+    removed, deleted_ids, taken = 0, [], []
+    for row in rows:
+        available = row.quantity or 1
+        take = available if quantity is None else min(available, quantity - removed)
+        if take <= 0:
+            break
+        if take == available:
+            deleted_ids.append(row.id)
+        else:
+            db.execute(update(table).where(table.c.id == row.id).values(quantity=available - take))
+        removed += take
+        taken.append((row.name, take, row.expiry_date))
+    if deleted_ids:
+        db.execute(delete(table).where(table.c.id.in_(deleted_ids)))
+    return removed, taken
+
+
+def inventory_summary(db, user_id):
+    """[(name, total quantity)] per distinct name (case-insensitive), soonest-expiring first."""
+    earliest = func.min(FoodItemDB.expiry_date)
+    return db.execute(
+        select(func.min(FoodItemDB.name), func.sum(FoodItemDB.quantity))
+        .where(FoodItemDB.user_id == user_id)
+        .group_by(func.lower(FoodItemDB.name))
+        .order_by(earliest.is_(None), earliest, func.lower(FoodItemDB.name))
+    ).all()
+
+
+def expiring_items(db, user_id, within_days, today=None):
+    """A user's dated items expiring within `within_days` (or already expired), soonest first."""
+    cutoff = (today or date.today()) + timedelta(days=within_days)
+    return db.execute(
+        select(*INVENTORY_COLUMNS)
+        .where(FoodItemDB.user_id == user_id, FoodItemDB.expiry_date.isnot(None), FoodItemDB.expiry_date <= cutoff)
+        .order_by(FoodItemDB.expiry_date, FoodItemDB.id)
+    ).all()
+
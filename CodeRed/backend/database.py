@@ -1,17 +1,144 @@
-from sqlalchemy import create_engine, Column, Integer, String, Date
+import os
+from sqlalchemy import create_engine, event, Column, Integer, String, Date, Index
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
-DATABASE_URL = "sqlite:///./food_inventory.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+from metrics import instrument_engine
+
+# Any SQLAlchemy URL works (e.g. postgresql://...); SQLite is the default
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./food_inventory.db")
+
+# SQLite tuning, applied to every new connection. The defaults favour
+# concurrent readers + writers: WAL lets reads proceed during a write,
+# synchronous=NORMAL is durable in WAL mode except on power loss, and the
+# busy timeout makes writers queue instead of failing with "database is locked".
+SQLITE_SETTINGS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB, so 64 MiB
+}
+
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+}
+
+
+def make_engine(url=DATABASE_URL, sqlite_settings=SQLITE_SETTINGS, pool_settings=POOL_SETTINGS):
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_pre_ping=True, **pool_settings)
+
+    in_memory = url in ("sqlite://", "sqlite:///:memory:")
+    engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": sqlite_settings["busy_timeout"] / 1000,
+        },
+        # SQLAlchemy 1.4 opens a fresh connection per checkout for file
+        # databases; pooling keeps the PRAGMAs and page cache warm
+        **({} if in_memory else {"poolclass": QueuePool, **pool_settings}),
+    )
+
+    @event.listens_for(engine, "connect")
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(sqlite_settings['busy_timeout'])}")
+        if not in_memory:
+            cursor.execute(f"PRAGMA journal_mode = {sqlite_settings['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous = {sqlite_settings['synchronous']}")
+        cursor.execute(f"PRAGMA mmap_size = {int(sqlite_settings['mmap_size'])}")
+        cursor.execute(f"PRAGMA cache_size = {int(sqlite_settings['cache_size'])}")
+        cursor.close()
+
+    return engine
+
+
+engine = make_engine()
+instrument_engine(engine)
 Base = declarative_base()
 SessionLocal = sessionmaker(bind=engine, autoflush=False)
 
 class FoodItemDB(Base):
     __tablename__ = "food_items"
+    __table_args__ = (
+        # Every inventory query is scoped to one user; these cover the
+        # expiry-ordered listing and name lookups without touching other users' rows
+        Index("ix_food_items_user_expiry", "user_id", "expiry_date"),
+        Index("ix_food_items_user_name", "user_id", "name"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     quantity = Column(Integer)
     expiry_date = Column(Date)
     user_id = Column(String)
 
+
+class InventoryVersionDB(Base):
+    """Per-user change counter for food_items, bumped by the triggers below."""
+    __tablename__ = "inventory_versions"
+    user_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Bump the owner's inventory_versions row on every food_items insert, update and
+# delete, whoever makes it (another worker, another instance, a migration or the
+# sqlite3 shell), so in-process caches of the inventory can check they are current.
+_BUMP_SQLITE = """
+    INSERT INTO inventory_versions (user_id, version) SELECT {row}.user_id, 1 WHERE {condition}
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1;"""
+INVENTORY_VERSION_TRIGGERS = {
+    "sqlite": [
+        "CREATE TRIGGER IF NOT EXISTS food_items_version_insert AFTER INSERT ON food_items BEGIN"
+        + _BUMP_SQLITE.format(row="NEW", condition="NEW.user_id IS NOT NULL") + " END",
+        "CREATE TRIGGER IF NOT EXISTS food_items_version_delete AFTER DELETE ON food_items BEGIN"
+        + _BUMP_SQLITE.format(row="OLD", condition="OLD.user_id IS NOT NULL") + " END",
+        "CREATE TRIGGER IF NOT EXISTS food_items_version_update AFTER UPDATE ON food_items BEGIN"
+        + _BUMP_SQLITE.format(row="OLD", condition="OLD.user_id IS NOT NULL")
+        + _BUMP_SQLITE.format(row="NEW", condition="NEW.user_id IS NOT NULL AND NEW.user_id IS NOT OLD.user_id")
+        + " END",
+    ],
+    "postgresql": [
+        """
+        CREATE OR REPLACE FUNCTION bump_inventory_version() RETURNS trigger AS $$
+        DECLARE
+            old_user TEXT;
+            new_user TEXT;
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                old_user := OLD.user_id;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                new_user := NEW.user_id;
+            END IF;
+            IF old_user IS NOT NULL THEN
+                INSERT INTO inventory_versions (user_id, version) VALUES (old_user, 1)
+                ON CONFLICT (user_id) DO UPDATE SET version = inventory_versions.version + 1;
+            END IF;
+            IF new_user IS NOT NULL AND new_user IS DISTINCT FROM old_user THEN
+                INSERT INTO inventory_versions (user_id, version) VALUES (new_user, 1)
+                ON CONFLICT (user_id) DO UPDATE SET version = inventory_versions.version + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+        "DROP TRIGGER IF EXISTS food_items_inventory_version ON food_items",
+        "CREATE TRIGGER food_items_inventory_version AFTER INSERT OR UPDATE OR DELETE ON food_items "
+        "FOR EACH ROW EXECUTE PROCEDURE bump_inventory_version()",
+    ],
+}
+
 Base.metadata.create_all(bind=engine)
+# create_all skips indexes on tables that already exist, so add any new ones explicitly
+for index in FoodItemDB.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+if engine.dialect.name in INVENTORY_VERSION_TRIGGERS:
+    with engine.begin() as conn:
+        for statement in INVENTORY_VERSION_TRIGGERS[engine.dialect.name]:
+            conn.exec_driver_sql(statement)
+else:
+    print(f"⚠️ No inventory version triggers for {engine.dialect.name}: the prompt inventory "
+          "only sees writes made through this process")
@@ -1,36 +1,98 @@
 # elevenlabs_utils.py
+import asyncio
 import os
-import requests
 from dotenv import load_dotenv
 
+from metrics import stage_timer
+from provider_clients import get_elevenlabs_client
+from tts_cache import TTSCache, cache_key
+
 load_dotenv()
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 
-def text_to_speech_elevenlabs(prompt_text, voice_id="QPBKI85w0cdXVqMSJ6WB"):
-    """
-    Convert text to speech using ElevenLabs API
-    Default voice_id is for a natural female voice
-    """
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-    headers = {
-        "xi-api-key": ELEVENLABS_API_KEY,
-        "Content-Type": "application/json"
-    }
-    data = {
+DEFAULT_VOICE_ID = "QPBKI85w0cdXVqMSJ6WB"
+VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.8
+}
+
+tts_cache = TTSCache(
+    max_memory_bytes=int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024))),
+    disk_dir=os.getenv("TTS_CACHE_DIR", "./tts_cache") or None,
+    max_disk_bytes=int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024))),
+)
+
+def _tts_request(prompt_text):
+    return {
         "text": prompt_text,
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.8
-        }
+        "voice_settings": VOICE_SETTINGS
     }
-    
+
+
+async def _fetch_tts(prompt_text, voice_id):
     print(f"🔊 Calling ElevenLabs TTS for text: {prompt_text[:50]}...")
-    
-    response = requests.post(url, headers=headers, json=data)
-    
-    if response.status_code != 200:
-        print(f"❌ ElevenLabs error: {response.status_code} - {response.text}")
-        raise Exception(f"ElevenLabs API error: {response.status_code}")
-    
+
+    try:
+        with stage_timer("tts"):
+            response = await get_elevenlabs_client().post(
+                f"/v1/text-to-speech/{voice_id}", json=_tts_request(prompt_text)
+            )
+    except Exception as e:
+        print(f"❌ ElevenLabs error: {e}")
+        raise
+
     print(f"✅ Audio generated successfully ({len(response.content)} bytes)")
-    return response.content  # mp3 bytes
\ No newline at end of file
+    return response.content  # mp3 bytes
+
+
+async def text_to_speech_elevenlabs(prompt_text, voice_id=DEFAULT_VOICE_ID):
+    """
+    Convert text to speech using ElevenLabs API
+    Default voice_id is for a natural female voice
+    Repeated phrases are served from tts_cache
+    """
+    key = cache_key(prompt_text, voice_id, VOICE_SETTINGS)
+    return await tts_cache.get_or_fetch(key, lambda: _fetch_tts(prompt_text, voice_id))
+
+
+async def stream_text_to_speech_elevenlabs(prompt_text, voice_id=DEFAULT_VOICE_ID, chunk_size=4096):
+    """
+    Same as text_to_speech_elevenlabs, but yields mp3 chunks as ElevenLabs produces them.
+    Chunks are collected for the cache only while the clip still fits in it,
+    so long narrations pass straight through without being held in memory.
+    """
+    key = cache_key(prompt_text, voice_id, VOICE_SETTINGS)
+    audio = await tts_cache.lookup(key)
+    if audio is None and tts_cache.is_fetching(key):
+        audio = await tts_cache.wait_for(key)
+    if audio is not None:
+        for start in range(0, len(audio), chunk_size):
+            yield audio[start:start + chunk_size]
+        return
+
+    print(f"🔊 Streaming ElevenLabs TTS for text: {prompt_text[:50]}...")
+
+    async with tts_cache.fetching(key) as entry:
+        chunks, size = [], 0
+        with stage_timer("tts") as timer:
+            async with get_elevenlabs_client().stream(
+                f"/v1/text-to-speech/{voice_id}/stream", json=_tts_request(prompt_text)
+            ) as response:
+                async for chunk in response.aiter_bytes(chunk_size):
+                    size += len(chunk)
+                    if chunks is not None and size <= tts_cache.max_entry_bytes:
+                        chunks.append(chunk)
+                    else:
+                        chunks = None
+                    with timer.paused():
+                        yield chunk
+        entry["audio"] = b"".join(chunks) if chunks is not None else None
+
+
+async def warm_tts_cache(phrases, voice_id=DEFAULT_VOICE_ID):
+    """Synthesize common phrases ahead of time; already-cached ones cost nothing."""
+    results = await asyncio.gather(
+        *(text_to_speech_elevenlabs(phrase, voice_id) for phrase in phrases),
+        return_exceptions=True,
+    )
+    failed = sum(isinstance(result, Exception) for result in results)
+    print(f"🔥 TTS cache warmed: {len(phrases) - failed}/{len(phrases)} phrases ready")
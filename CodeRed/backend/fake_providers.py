@@ -0,0 +1,153 @@
+# fake_providers.py
+"""
+Local stand-ins for the Gemini and ElevenLabs HTTP APIs.
+Enabled with FAKE_PROVIDERS=1: provider_clients then routes every call
+through fake_transport() instead of the network, so the backend (and the
+benchmarks) run without API keys. Latencies and payload sizes are
+configurable through the environment. benchmarks/stub_servers.py serves the
+same payloads over real sockets.
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+import httpx
+
+FAKE_GEMINI_LATENCY = float(os.getenv("FAKE_GEMINI_LATENCY", "0.4"))        # seconds to first token
+FAKE_GEMINI_TOKEN_DELAY = float(os.getenv("FAKE_GEMINI_TOKEN_DELAY", "0.01"))  # seconds per streamed chunk
+FAKE_TTS_LATENCY = float(os.getenv("FAKE_TTS_LATENCY", "0.25"))              # seconds to first audio byte
+FAKE_TTS_CHAR_DELAY = float(os.getenv("FAKE_TTS_CHAR_DELAY", "0.002"))       # synthesis time per character
+FAKE_TTS_BYTES_PER_CHAR = int(os.getenv("FAKE_TTS_BYTES_PER_CHAR", "400"))   # ~mp3 size per character
+FAKE_GEMINI_REPLY_CHARS = int(os.getenv("FAKE_GEMINI_REPLY_CHARS", "0"))     # pad text replies to this length (0 = as written)
+FAKE_VISION_ITEMS = int(os.getenv("FAKE_VISION_ITEMS", "2"))                 # items detected per photo
+
+CHUNK_CHARS = 12
+AUDIO_CHUNK_BYTES = 4096
+
+FAKE_INTENT_REPLY = (
+    "items_to_add = []\n"
+    "assistant_response = \"Great question! You have everything you need for a quick veggie omelette. "
+    "Whisk three eggs with a splash of milk and a pinch of salt. "
+    "Saute the spinach and tomatoes for two minutes, then pour the eggs over them. "
+    "Fold it once the edges set and serve it warm. Enjoy your meal!\""
+)
+
+FAKE_RECIPE = (
+    "Today we're making a cheesy spinach omelette!\n"
+    "- eggs\n- spinach\n- cheese\n"
+    "1. Whisk the eggs. 2. Wilt the spinach in a pan. 3. Add the eggs and cheese.\n"
+    "Say next once you have completed these steps."
+)
+
+
+FILLER_SENTENCE = " Keep stirring gently so nothing sticks to the pan."
+VISION_ITEM_NAMES = ["spinach", "tomatoes", "cheddar cheese", "bread", "apples", "rice", "butter", "yogurt"]
+
+
+def padded(text, chars):
+    """Stretch a canned reply to about `chars` characters, inside the closing quote of an assistant_response."""
+    if len(text) >= chars:
+        return text
+    closing = '"' if text.endswith('"') else ""
+    filler = FILLER_SENTENCE * ((chars - len(text)) // len(FILLER_SENTENCE) + 1)
+    return text[:len(text) - len(closing)] + filler + closing
+
+
+def vision_reply(count):
+    expiry = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+    items = [{'name': 'milk', 'quantity': 1, 'expiry_date': expiry}, {'name': 'eggs', 'quantity': 12}]
+    items += [{'name': VISION_ITEM_NAMES[i % len(VISION_ITEM_NAMES)], 'quantity': 1 + i % 3, 'expiry_date': expiry}
+              for i in range(max(count - len(items), 0))]
+    return repr(items[:count])
+
+
+def gemini_reply_for(payload):
+    """Pick a canned reply based on what the request looks like."""
+    parts = payload["contents"][0]["parts"]
+    if any("inline_data" in part for part in parts):
+        return vision_reply(FAKE_VISION_ITEMS)
+    prompt = " ".join(part.get("text", "") for part in parts)
+    if "items_to_add" in prompt:
+        return padded(FAKE_INTENT_REPLY, FAKE_GEMINI_REPLY_CHARS)
+    return padded(FAKE_RECIPE, FAKE_GEMINI_REPLY_CHARS)
+
+
+def gemini_chunks(text):
+    return [text[start:start + CHUNK_CHARS] for start in range(0, len(text), CHUNK_CHARS)]
+
+
+def gemini_response_body(text):
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+def gemini_sse_event(text):
+    return f"data: {json.dumps(gemini_response_body(text))}\r\n\r\n".encode("utf-8")
+
+
+def gemini_total_delay(text):
+    return FAKE_GEMINI_LATENCY + FAKE_GEMINI_TOKEN_DELAY * len(gemini_chunks(text))
+
+
+def fake_audio_size(text):
+    return len(text) * FAKE_TTS_BYTES_PER_CHAR // 2 * 2
+
+
+def fake_audio_for(text):
+    return b"\xff\xf3" * (fake_audio_size(text) // 2)
+
+
+def fake_audio_chunks(text):
+    """fake_audio_for(text) in AUDIO_CHUNK_BYTES pieces, generated as they are sent like a real stream."""
+    remaining = fake_audio_size(text)
+    while remaining > 0:
+        size = min(AUDIO_CHUNK_BYTES, remaining)
+        yield b"\xff\xf3" * (size // 2)
+        remaining -= size
+
+
+def tts_chunk_delay(text):
+    audio_len = max(fake_audio_size(text), 1)
+    return FAKE_TTS_CHAR_DELAY * len(text) * AUDIO_CHUNK_BYTES / audio_len
+
+
+async def _stream_gemini(text):
+    await asyncio.sleep(FAKE_GEMINI_LATENCY)
+    for chunk in gemini_chunks(text):
+        yield gemini_sse_event(chunk)
+        await asyncio.sleep(FAKE_GEMINI_TOKEN_DELAY)
+
+
+async def _stream_audio(text):
+    await asyncio.sleep(FAKE_TTS_LATENCY)
+    for chunk in fake_audio_chunks(text):
+        yield chunk
+        await asyncio.sleep(tts_chunk_delay(text))
+
+
+async def _handle(request):
+    path = request.url.path
+    payload = json.loads(request.content or b"{}")
+
+    if path.startswith("/v1beta/models/"):
+        text = gemini_reply_for(payload)
+        if path.endswith(":streamGenerateContent"):
+            return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                  content=_stream_gemini(text))
+        await asyncio.sleep(gemini_total_delay(text))
+        return httpx.Response(200, json=gemini_response_body(text))
+
+    if path.startswith("/v1/text-to-speech/"):
+        text = payload.get("text", "")
+        if path.endswith("/stream"):
+            return httpx.Response(200, headers={"content-type": "audio/mpeg"},
+                                  content=_stream_audio(text))
+        await asyncio.sleep(FAKE_TTS_LATENCY + FAKE_TTS_CHAR_DELAY * len(text))
+        return httpx.Response(200, headers={"content-type": "audio/mpeg"},
+                              content=fake_audio_for(text))
+
+    return httpx.Response(404, json={"error": f"unknown fake endpoint {path}"})
+
+
+def fake_transport():
+    return httpx.MockTransport(_handle)
@@ -1,58 +1,137 @@
-import os
+import re
+import ast
+import json
+import base64
+from datetime import date
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from provider_clients import get_gemini_client
+from metrics import stage_timer
 
 
 load_dotenv()  # loads variables from .env
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=API_KEY)
+# A sentence ends at . ! or ? followed by whitespace. Very short fragments
+# ("1.", "Hi!") are merged into the next sentence so TTS calls stay worthwhile.
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\']?\s+')
+MIN_SENTENCE_CHARS = 20
+REPLY_PREFIX = re.compile(r'^assistant_response\s*=\s*"?', re.MULTILINE)
+
+# Fixed phrases the model is told to say verbatim (also pre-warmed in the TTS cache)
+OFF_TOPIC_REPLY = "I'm your kitchen assistant! I can help with recipes, cooking tips, and managing your groceries. What would you like to cook today?"
+NEXT_STEP_PHRASE = "Say next once you have completed these steps."
+
+
+def _model_path(model_name, method):
+    return f"/v1beta/models/{model_name.removeprefix('models/')}:{method}"
+
+
+def _llm_timer(model_name):
+    return stage_timer("llm", model=model_name.removeprefix('models/'))
+
+
+def _response_text(body):
+    candidates = body.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
 
-def get_factual_recipe(ingredient: str):
+async def generate_content(model_name, parts):
+    """Single Gemini generateContent call over the shared connection pool."""
+    with _llm_timer(model_name):
+        response = await get_gemini_client().post(
+            _model_path(model_name, "generateContent"),
+            json={"contents": [{"role": "user", "parts": parts}]},
+        )
+        return _response_text(response.json())
+
+
+async def stream_generate_content(model_name, parts):
+    """
+    Yield text chunks from Gemini's streamGenerateContent (SSE) endpoint.
+    Only time spent waiting on Gemini counts towards the llm stage, not the
+    time the caller spends on each chunk (e.g. TTS for a finished sentence).
+    """
+    with _llm_timer(model_name) as timer:
+        async with get_gemini_client().stream(
+            _model_path(model_name, "streamGenerateContent"),
+            params={"alt": "sse"},
+            json={"contents": [{"role": "user", "parts": parts}]},
+        ) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    text = _response_text(json.loads(line[5:]))
+                    if text:
+                        with timer.paused():
+                            yield text
+
+
+def inventory_context(inventory):
+    """Prompt line for an InventoryDigest.text() rendering; the date lets the model judge the expiry dates."""
+    return (
+        f"Today is {date.today().isoformat()}. "
+        f"Inventory (quantities and expiry dates, soonest-expiring first): {inventory}. "
+    )
+
+
+def build_recipe_prompt(inventory):
     # You can customize this prompt as needed
-    prompt = (
+    return (
     f"You are a friendly expert cooking guide conversing with a human home chef. "
-    f"Only use the following ingredients from my inventory: {ingredient}. "
+    f"{inventory_context(inventory)}"
+    "Only use ingredients from this inventory. "
     "Start with a brief, upbeat intro: tell the user what you'll be making today. Give the recipe name."
     "Then, in a friendly tone, list all the required ingredients as bullet points."
     "Next, guide the user through the cooking process step by step, numbering each instruction and only use ingredients from the list."
     "Bundle these steps together so users can easily cook and follow or listen to the recipe."
-    "After every step or small group of steps, say: 'Say next once you have completed these steps.'"
+    f"After every step or small group of steps, say: '{NEXT_STEP_PHRASE}'"
     "Do NOT include any extra or hallucinated ingredients or steps."
     "Use ingredients which are going to be expiring soon first."
     "Format this for clear and friendly TTS narration, helping the listener to cook along as they go."
     )
-    model = genai.GenerativeModel('gemini-1.5-flash')
 
-    response = model.generate_content(prompt)
-    return response.text
 
-def get_kitchen_intent_response(user_query, ingredient):
-    prompt = (
+async def get_factual_recipe(inventory: str):
+    return await generate_content('gemini-1.5-flash', [{"text": build_recipe_prompt(inventory)}])
+
+def build_kitchen_intent_prompt(user_query, inventory):
+    return (
         "You are a smart kitchen assistant named '67 Kitchen Assistant'. "
         "IMPORTANT: You ONLY help with cooking, recipes, food, groceries, and kitchen-related topics. "
         "If the user asks about anything else (math, weather, general knowledge, etc.), politely redirect them back to kitchen topics. "
-        "For example: 'I'm your kitchen assistant! I can help with recipes, cooking tips, and managing your groceries. What would you like to cook today?' "
+        f"For example: '{OFF_TOPIC_REPLY}' "
         "\n"
         "If the user's message is about buying groceries or adding items to inventory, output a valid Python list of the item names they bought, named 'items_to_add'. "
         "Otherwise, provide a conversational, accurate kitchen response to their command. "
-        f"User's current inventory: {ingredient}. "
+        f"{inventory_context(inventory)}"
         f"User's voice command: {user_query}. "
         "\n"
         "Respond in this format:\n"
         "items_to_add = [...]\n"
         "assistant_response = \"Construct a friendly reply here.\""
     )
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    response = model.generate_content(prompt)
-    text = response.text
+
+
+def parse_items_line(text):
+    """Return the items_to_add list from a complete line, or None if there isn't one yet."""
+    for line in text.splitlines(keepends=True):
+        if line.startswith("items_to_add") and line.endswith("\n"):
+            try:
+                items = ast.literal_eval(line.split("=", 1)[1].strip())
+                return list(items) if isinstance(items, (list, tuple)) else []
+            except Exception:
+                return []
+    return None
+
+
+async def get_kitchen_intent_response(user_query, inventory):
+    prompt = build_kitchen_intent_prompt(user_query, inventory)
+    text = await generate_content('gemini-2.5-flash', [{"text": prompt}])
 
     # Parse items_to_add list from Gemini's response
-    try:
-        items_line = next(line for line in text.splitlines() if line.startswith("items_to_add"))
-        items = eval(items_line.split("=")[1].strip())
-    except Exception:
-        items = []
+    items = parse_items_line(text + "\n") or []
 
     reply_line = next((line for line in text.splitlines() if line.startswith("assistant_response")), "")
     assistant_reply = reply_line.split("=",1)[-1].strip().strip('"')
@@ -60,14 +139,75 @@ def get_kitchen_intent_response(user_query, ingredient):
     return {"items_to_add": items, "reply": assistant_reply or text}
 
 
-def analyze_grocery_image(image_bytes):
-    import google.generativeai as genai
+def split_sentences(buffer):
+    """Split complete sentences off the front of buffer, returning (sentences, remainder)."""
+    sentences = []
+    start = 0
+    for match in SENTENCE_BOUNDARY.finditer(buffer):
+        sentence = buffer[start:match.end()].strip()
+        if len(sentence) >= MIN_SENTENCE_CHARS:
+            sentences.append(sentence)
+            start = match.end()
+    return sentences, buffer[start:]
+
+
+class KitchenReplyParser:
+    """
+    Incrementally parse streamed intent text.
+    feed() returns {"items_to_add": [...]} once, as soon as it is known, and
+    then {"sentence": "..."} for each complete sentence of the assistant reply.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.items_sent = False
+        self.reply_pos = None
+
+    def feed(self, chunk):
+        events = []
+        self.text += chunk
+        if not self.items_sent:
+            items = parse_items_line(self.text)
+            if items is not None or REPLY_PREFIX.search(self.text):
+                events.append({"items_to_add": items or []})
+                self.items_sent = True
+        if self.reply_pos is None:
+            match = REPLY_PREFIX.search(self.text)
+            if match is None:
+                return events
+            self.reply_pos = match.end()
+        sentences, rest = split_sentences(self.text[self.reply_pos:])
+        events.extend({"sentence": sentence} for sentence in sentences)
+        self.reply_pos = len(self.text) - len(rest)
+        return events
+
+    def close(self):
+        events = []
+        if not self.items_sent:
+            events.append({"items_to_add": parse_items_line(self.text + "\n") or []})
+
+        # No reply marker at all: speak the raw text, like get_kitchen_intent_response does
+        remainder = self.text[self.reply_pos:] if self.reply_pos is not None else self.text
+        remainder = remainder.strip().rstrip('"').strip()
+        if remainder:
+            events.append({"sentence": remainder})
+        return events
+
+
+async def stream_kitchen_intent_response(user_query, inventory):
+    prompt = build_kitchen_intent_prompt(user_query, inventory)
+    parser = KitchenReplyParser()
+    async for chunk in stream_generate_content('gemini-2.5-flash', [{"text": prompt}]):
+        for event in parser.feed(chunk):
+            yield event
+    for event in parser.close():
+        yield event
+
+
+async def analyze_grocery_image(image_bytes, mime_type=None):
     from PIL import Image
     import io
 
-    # Use gemini-1.5-flash which supports vision
-    model = genai.GenerativeModel('models/gemini-2.5-flash-image-preview')
-
     vision_prompt = (
         "You are a grocery inventory assistant. Given a photo of shopping items, output only a valid Python list of dicts—"
         "each with: name (string), optional quantity (int if visible), and estimated expiry_date (YYYY-MM-DD, guess if not visible)."
@@ -75,17 +215,22 @@ def analyze_grocery_image(image_bytes):
         "If you see unclear/unknown items, best guess their name. Output nothing else."
     )
 
-    # Convert bytes to PIL Image for Gemini
+    # Send the image inline; PIL only sniffs the format when mime_type isn't given
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        response = model.generate_content([vision_prompt, image])
-        raw_text = response.text
+        if mime_type is None:
+            image_format = Image.open(io.BytesIO(image_bytes)).format or "JPEG"
+            mime_type = Image.MIME.get(image_format, "image/jpeg")
+        image_part = {"inline_data": {
+            "mime_type": mime_type,
+            "data": base64.b64encode(image_bytes).decode("utf-8"),
+        }}
+        raw_text = await generate_content('models/gemini-2.5-flash-image-preview',
+                                          [{"text": vision_prompt}, image_part])
     except Exception as e:
         print(f"Error calling Gemini API: {e}")
-        return {"items": [], "raw_text": f"Error: {str(e)}"}
+        return {"items": [], "raw_text": f"Error: {str(e)}", "parsed": False}
 
     # Attempt to eval the list of dicts from Gemini output
-    import ast
     from datetime import datetime, timedelta
     try:
         # Clean up the response to extract just the list
@@ -97,10 +242,12 @@ def analyze_grocery_image(image_bytes):
                 cleaned_text = cleaned_text[6:].strip()
         
         items = ast.literal_eval(cleaned_text)
+        parsed = True
     except Exception as e:
         print(f"Error parsing Gemini response: {e}")
         print(f"Raw response: {raw_text}")
         items = []
+        parsed = False
 
     # Always add honey to the inventory
     honey_expiry = (datetime.now() + timedelta(days=365)).strftime('%Y-%m-%d')  # Honey lasts ~1 year
@@ -110,4 +257,5 @@ def analyze_grocery_image(image_bytes):
         'expiry_date': honey_expiry
     })
 
-    return {"items": items, "raw_text": raw_text}
+    # parsed=False marks a failed analysis (only honey), which must not be cached
+    return {"items": items, "raw_text": raw_text, "parsed": parsed}
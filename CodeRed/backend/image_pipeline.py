@@ -0,0 +1,152 @@
+# image_pipeline.py
+"""
+Preprocessing for /scan_grocery_image uploads before they reach the vision model:
+EXIF orientation, downscale to a max edge, compact re-encode and a perceptual
+hash so re-uploads of the same photo can reuse the previous analysis.
+The CPU work runs in a worker pool, off the event loop.
+"""
+import asyncio
+import io
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1600"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()  # JPEG or WEBP
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+IMAGE_EXECUTOR = os.getenv("IMAGE_EXECUTOR", "thread")  # thread or process
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+IMAGE_HASH_DISTANCE = int(os.getenv("IMAGE_HASH_DISTANCE", "4"))  # max differing bits for a "same photo"
+IMAGE_CACHE_ENTRIES = int(os.getenv("IMAGE_CACHE_ENTRIES", "256"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        if IMAGE_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash: robust to re-encoding, resizing and small exposure changes."""
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def preprocess_image(source, max_edge=IMAGE_MAX_EDGE, image_format=IMAGE_FORMAT, quality=IMAGE_QUALITY):
+    """
+    source is a file object (e.g. the upload's spooled temp file) or bytes.
+    Returns a dict with the re-encoded bytes, mime type, perceptual hash and
+    per-stage stats. Runs synchronously; call through prepare_upload().
+    """
+    timings = {}
+    start = time.perf_counter()
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    source.seek(0, os.SEEK_END)
+    original_bytes = source.tell()
+    source.seek(0)
+
+    image = Image.open(source)
+    original_size = image.size
+    ratio = max_edge / max(original_size)
+    if ratio < 1:
+        # JPEG can decode straight to a reduced scale, far cheaper than a full 12MP decode
+        image.draft("RGB", (int(original_size[0] * ratio), int(original_size[1] * ratio)))
+    image = ImageOps.exif_transpose(image)
+    timings["decode_ms"] = (time.perf_counter() - start) * 1000
+
+    stage = time.perf_counter()
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_edge, max_edge), Image.BICUBIC)
+    timings["resize_ms"] = (time.perf_counter() - stage) * 1000
+
+    stage = time.perf_counter()
+    phash = dhash(image)
+    timings["hash_ms"] = (time.perf_counter() - stage) * 1000
+
+    stage = time.perf_counter()
+    out = io.BytesIO()
+    image.save(out, format=image_format, quality=quality, optimize=image_format == "JPEG")
+    data = out.getvalue()
+    timings["encode_ms"] = (time.perf_counter() - stage) * 1000
+
+    return {
+        "data": data,
+        "mime_type": MIME_TYPES.get(image_format, "image/jpeg"),
+        "phash": phash,
+        "stats": {
+            "original_bytes": original_bytes,
+            "processed_bytes": len(data),
+            "bytes_saved": original_bytes - len(data),
+            "original_size": list(original_size),
+            "processed_size": list(image.size),
+            **{name: round(ms, 2) for name, ms in timings.items()},
+        },
+    }
+
+
+async def prepare_upload(upload_file):
+    """
+    Preprocess a Starlette UploadFile in the worker pool. The upload is
+    already spooled to a temp file by Starlette; in thread mode the worker
+    reads it directly, in process mode its bytes are shipped to the worker.
+    """
+    loop = asyncio.get_running_loop()
+    source = upload_file.file
+    if IMAGE_EXECUTOR == "process":
+        source = await upload_file.read()
+    return await loop.run_in_executor(get_executor(), preprocess_image, source)
+
+
+class PerceptualHashCache:
+    """Bounded LRU of analysis results, matched by dHash Hamming distance."""
+
+    def __init__(self, max_entries=IMAGE_CACHE_ENTRIES, max_distance=IMAGE_HASH_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # phash -> analysis
+        self.metrics = {"hits": 0, "misses": 0}
+
+    def get(self, phash):
+        for known_hash, analysis in self._entries.items():
+            if bin(known_hash ^ phash).count("1") <= self.max_distance:
+                self._entries.move_to_end(known_hash)
+                self.metrics["hits"] += 1
+                return analysis
+        self.metrics["misses"] += 1
+        return None
+
+    def put(self, phash, analysis):
+        self._entries[phash] = analysis
+        self._entries.move_to_end(phash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {**self.metrics, "entries": len(self._entries)}
@@ -0,0 +1,181 @@
+# inventory_digest.py
+"""
+Per-user summary of the inventory for prompt building: one entry per item
+(duplicate rows and singular/plural spellings merged), quantities summed and
+ordered by the earliest expiry date, rendered within a token budget so the
+prompt stops growing with the pantry. It is loaded once at startup and then
+updated by the write endpoints, so building a prompt never scans food_items.
+
+Writes from elsewhere (other workers or instances, scripts, the sqlite3 shell)
+don't reach it, so each user's entries remember the inventory_versions count
+they reflect and each local write adds one per row it changed, as the database
+triggers do. Before building a prompt the caller compares that with the table
+(is_current) and reloads the user from food_items when they differ.
+"""
+import os
+import threading
+from collections import Counter
+
+PROMPT_INVENTORY_TOKENS = int(os.getenv("PROMPT_INVENTORY_TOKENS", "400"))
+EMPTY_INVENTORY = "no ingredients currently stored"
+
+
+def canonical_name(name):
+    """Merge key for item names: lowercased, whitespace collapsed, naive singular ("tomatoes" -> "tomato")."""
+    words = str(name).lower().split()
+    if not words:
+        return ""
+    last = words[-1]
+    if len(last) > 3 and not last.endswith(("ss", "us", "is")):
+        if last.endswith("ies"):
+            last = last[:-3] + "y"
+        elif last.endswith(("oes", "ches", "shes", "xes")):
+            last = last[:-2]
+        elif last.endswith("s"):
+            last = last[:-1]
+    return " ".join(words[:-1] + [last])
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text; close enough for a budget
+    return len(text) // 4 + 1
+
+
+def describe_item(name, quantity, expiry):
+    text = f"{quantity} {name}" if quantity > 1 else name
+    return f"{text} (expires {expiry.isoformat()})" if expiry else text
+
+
+class _Entry:
+    __slots__ = ("quantity", "expiries", "spellings")
+
+    def __init__(self):
+        self.quantity = 0
+        self.expiries = Counter()  # expiry_date (or None) -> units with that date
+        self.spellings = Counter()  # stored name -> units, e.g. {"Tomatoes": 2, "tomato": 1}
+
+    @property
+    def name(self):
+        # The spelling holding the most units, so it doesn't depend on write order
+        return max(self.spellings, key=lambda name: (self.spellings[name], name))
+
+    def earliest(self):
+        dated = [expiry for expiry in self.expiries if expiry is not None]
+        return min(dated) if dated else None
+
+
+class InventoryDigest:
+    """
+    Rows are (name, quantity, expiry_date) tuples or food_row() dicts; removals
+    pass the units actually taken out, so partial decrements stay exact.
+    Pass one row per food_items row changed so the expected version keeps up;
+    merged rows only cost a reload, never a stale read (the count can only
+    fall short).
+    """
+
+    def __init__(self, token_budget=PROMPT_INVENTORY_TOKENS):
+        self.token_budget = token_budget
+        self._users = {}  # user_id -> {canonical name: _Entry}
+        self._rendered = {}  # user_id -> prompt text, dropped on every write for that user
+        self._versions = {}  # user_id -> inventory_versions count the entries reflect (0 if never written)
+        self._lock = threading.Lock()  # sync endpoints update it from the threadpool
+
+    @staticmethod
+    def _fields(row):
+        if isinstance(row, dict):
+            return row["name"], row.get("quantity") or 1, row.get("expiry_date")
+        name, quantity, expiry = row
+        return name, quantity or 1, expiry
+
+    def _apply(self, user_id, rows, sign):
+        entries = self._users.setdefault(str(user_id), {})
+        for row in rows:
+            name, quantity, expiry = self._fields(row)
+            key = canonical_name(name)
+            entry = entries.get(key)
+            if entry is None:
+                if sign < 0:
+                    continue
+                entry = entries[key] = _Entry()
+            entry.quantity += sign * quantity
+            for counts, field in ((entry.expiries, expiry), (entry.spellings, " ".join(str(name).split()))):
+                counts[field] += sign * quantity
+                if counts[field] <= 0:
+                    del counts[field]
+            if entry.quantity <= 0 or not entry.expiries or not entry.spellings:
+                del entries[key]
+        self._rendered.pop(str(user_id), None)
+
+    def load(self, rows, versions=()):
+        """
+        Full build from (user_id, name, quantity, expiry_date) rows and
+        (user_id, version) pairs read in the same transaction; done once at startup.
+        """
+        with self._lock:
+            self._users, self._rendered = {}, {}
+            self._versions = {str(user_id): version for user_id, version in versions}
+            for user_id, name, quantity, expiry in rows:
+                self._apply(user_id, [(name, quantity, expiry)], 1)
+
+    def reload(self, user_id, rows, version):
+        """Rebuild one user from (name, quantity, expiry_date) rows read together with `version`."""
+        user_id = str(user_id)
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._apply(user_id, rows, 1)
+            self._versions[user_id] = version
+
+    def is_current(self, user_id, version):
+        with self._lock:
+            return self._versions.get(str(user_id), 0) == version
+
+    def _write(self, user_id, rows, sign):
+        rows = list(rows)
+        with self._lock:
+            self._apply(user_id, rows, sign)
+            self._versions[str(user_id)] = self._versions.get(str(user_id), 0) + len(rows)
+
+    def add(self, user_id, rows):
+        self._write(user_id, rows, 1)
+
+    def remove(self, user_id, rows):
+        self._write(user_id, rows, -1)
+
+    def _summary(self, user_id):
+        summary = [(entry.name, entry.quantity, entry.earliest())
+                   for entry in self._users.get(user_id, {}).values()]
+        return sorted(summary, key=lambda item: (item[2] is None, item[2] or 0, item[0].lower()))
+
+    def entries(self, user_id):
+        """[(name, total quantity, earliest expiry)] soonest-expiring first, undated items last."""
+        with self._lock:
+            return self._summary(str(user_id))
+
+    def text(self, user_id, token_budget=None):
+        """
+        Prompt-ready inventory: "3 eggs (expires 2025-10-21), milk (expires ...), rice".
+        Items that don't fit the token budget are summarized as "and N more items";
+        they are the latest-expiring ones, which the prompts care least about.
+        Renders at the default budget are cached until the user's next write.
+        """
+        user_id = str(user_id)
+        with self._lock:
+            if token_budget is None and user_id in self._rendered:
+                return self._rendered[user_id]
+            summary = self._summary(user_id)
+            budget = token_budget or self.token_budget
+
+            parts, used = [], 0
+            for index, item in enumerate(summary):
+                part = describe_item(*item)
+                cost = estimate_tokens(part + ", ")
+                if used + cost > budget - 8:  # keep room for the "and N more items" tail
+                    parts.append(f"and {len(summary) - index} more items")
+                    break
+                parts.append(part)
+                used += cost
+            text = ", ".join(parts) if parts else EMPTY_INVENTORY
+
+            if token_budget is None:
+                self._rendered[user_id] = text
+            return text
@@ -0,0 +1,167 @@
+# job_queue.py
+"""
+Background jobs for slow work (grocery-image analysis), so the HTTP request
+can return a job id immediately and the client polls /jobs/{id} or follows
+its SSE progress stream.
+
+JobQueue runs a fixed number of asyncio workers over a broker. The default
+InProcessBroker is a bounded asyncio.Queue; a broker backed by a local
+message queue only needs the same put_nowait/get/qsize methods.
+"""
+import asyncio
+import os
+import time
+import uuid
+
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "100"))
+JOB_MAX_CONCURRENT = int(os.getenv("JOB_MAX_CONCURRENT", "4"))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "120"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "3600"))  # seconds to keep finished jobs
+
+TERMINAL_STATUSES = {"done", "failed", "timeout"}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class InProcessBroker:
+    def __init__(self, max_depth=JOB_QUEUE_DEPTH):
+        self._queue = asyncio.Queue(maxsize=max_depth)
+
+    def put_nowait(self, job_id):
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full, try again later")
+
+    async def get(self):
+        return await self._queue.get()
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class Job:
+    def __init__(self, kind, payload):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.events = [{"stage": "queued"}]
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._changed = asyncio.Event()
+
+    def progress(self, stage, **details):
+        self.events.append({"stage": stage, **details})
+        self._changed.set()
+
+    async def wait_for_events(self, seen):
+        """Return events after index `seen`, waiting until there is at least one."""
+        while len(self.events) <= seen:
+            self._changed.clear()
+            await self._changed.wait()
+        return self.events[seen:]
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.events[-1]["stage"],
+            "result": self.result,
+            "error": self.error,
+            "queued_ms": round(((self.started_at or time.time()) - self.created_at) * 1000, 1),
+            "run_ms": round(((self.finished_at or time.time()) - self.started_at) * 1000, 1) if self.started_at else None,
+        }
+
+
+class JobQueue:
+    """
+    handlers maps a job kind to `async def handler(job) -> result`; handlers
+    report progress with job.progress(stage, ...).
+    """
+
+    def __init__(self, handlers, broker=None, max_concurrent=JOB_MAX_CONCURRENT, timeout=JOB_TIMEOUT):
+        self.handlers = handlers
+        self.broker = broker
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.jobs = {}
+        self._workers = []
+        self.metrics = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0, "timeout": 0}
+
+    def start(self):
+        if self.broker is None:
+            self.broker = InProcessBroker()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, kind, payload):
+        """Queue a job and return it; raises QueueFullError when the queue is at depth."""
+        self._prune()
+        job = Job(kind, payload)
+        try:
+            self.broker.put_nowait(job.id)
+        except QueueFullError:
+            self.metrics["rejected"] += 1
+            raise
+        self.jobs[job.id] = job
+        self.metrics["submitted"] += 1
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def _finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.payload = None  # drop the image bytes as soon as the job is done
+        self.metrics[status] += 1
+        job.progress(status, **({"error": error} if error else {}))
+
+    async def _worker(self):
+        while True:
+            job = self.jobs.get(await self.broker.get())
+            if job is None:
+                continue
+            job.status = "running"
+            job.started_at = time.time()
+            job.progress("running")
+            try:
+                result = await asyncio.wait_for(self.handlers[job.kind](job), self.timeout)
+            except asyncio.TimeoutError:
+                self._finish(job, "timeout", error=f"Job exceeded {self.timeout:g}s")
+            except asyncio.CancelledError:
+                self._finish(job, "failed", error="Server shutting down")
+                raise
+            except Exception as e:
+                print(f"❌ Job {job.id} failed: {e}")
+                self._finish(job, "failed", error=str(e))
+            else:
+                self._finish(job, "done", result=result)
+
+    def stats(self):
+        return {
+            **self.metrics,
+            "queue_depth": self.broker.qsize() if self.broker else 0,
+            "running": sum(job.status == "running" for job in self.jobs.values()),
+            "workers": len(self._workers),
+        }
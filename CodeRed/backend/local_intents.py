@@ -0,0 +1,288 @@
+# local_intents.py
+"""
+Rule/lexicon classifier for the voice commands that don't need a language
+model: adding, removing and listing groceries, and asking what expires soon.
+classify_utterance() only answers when it is confident; everything else
+(recipes, cooking questions, anything ambiguous) returns None and goes to
+Gemini as before. The phrase helpers build the spoken replies.
+"""
+import os
+import re
+
+from inventory_digest import canonical_name
+
+LOCAL_INTENT_MIN_CONFIDENCE = float(os.getenv("LOCAL_INTENT_MIN_CONFIDENCE", "0.75"))
+EXPIRING_WITHIN_DAYS = int(os.getenv("EXPIRING_WITHIN_DAYS", "3"))
+LIST_SPOKEN_ITEMS = 15  # longer inventories are summarized as "... and N more"
+
+FILLERS = re.compile(
+    r"^(?:(?:hey|hi|ok|okay|um|uh|so|well|please|kitchen|assistant|"
+    r"can you|could you|would you|will you|i want you to|i'd like you to)\b[\s,]*)+"
+)
+CONTRACTIONS = {
+    "what's": "what is", "whats": "what is", "i've": "i have", "ive": "i have",
+    "i'm": "i am", "im": "i am", "we've": "we have", "we're": "we are",
+    "there's": "there is", "that's": "that is", "it's": "it is", "don't": "do not",
+}
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "single": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17,
+    "eighteen": 18, "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "couple": 2, "pair": 2, "few": 3, "dozen": 12,
+}
+QUANTITY = re.compile(
+    r"^(?:(?P<half>half a dozen)|a (?P<vague>couple|pair|few)|(?P<count>\d+|" + "|".join(NUMBER_WORDS) + r")"
+    r"(?: (?P<dozen>dozen))?)(?: of)? "
+)
+UNITS = re.compile(
+    r"^(?:cartons?|bottles?|bags?|boxes?|cans?|jars?|packs?|packets?|packages?|loaf|loaves|"
+    r"bunch(?:es)?|heads?|pounds?|lbs?|kilos?|kg|grams?|liters?|litres?|gallons?|pieces?|"
+    r"slices?|sticks?|containers?|tubs?|blocks?|cups?|dozen|punnets?|tins?|crates?|sacks?|"
+    r"bars?|rolls?|trays?) of "
+)
+DETERMINERS = re.compile(r"^(?:(?:all of|all the|all|some|the|my|our|any|more|fresh|new)\b\s*)+")
+# "I used some milk" / "I finished my water" don't say how much is gone;
+# removals phrased like this go to Gemini instead of clearing every row
+PARTIAL_AMOUNT = re.compile(
+    r"^(?:some|my|our|half(?! a dozen)|part of|most of|the rest of|a (?:little|bit|splash|drop|dash|sip|bite|"
+    r"spoonful|handful|pinch|chunk|few bites|few sips)|a little bit|a tiny bit)\b"
+)
+ITEM_SEPARATOR = re.compile(r"\s*,\s*(?:and\s+)?|\s+and\s+|\s*&\s*|\s+plus\s+|\s+as well as\s+")
+PLACE_SUFFIX = re.compile(
+    r"\s+(?:to|from|in|into|out of|off)\s+(?:my|the|our)\s+"
+    r"(?:inventory|pantry|fridge|freezer|list|kitchen|cupboard|shelf|groceries)$"
+)
+# "put the milk away"; "back" is left on so "put the milk back" isn't read as a purchase
+PARTICLE_SUFFIX = re.compile(r"\s+(?:away|up|in|down|too|as well)$")
+TIME_SUFFIX = re.compile(
+    r"\s+(?:today|yesterday|this morning|this afternoon|tonight|just now|"
+    r"from the (?:store|shop|market|supermarket)|at the (?:store|shop|market|supermarket))$"
+)
+
+ADD_COMMAND = re.compile(
+    r"^(?:i |we )?(?:just |also )?(?:bought|purchased|got|picked up|grabbed|stocked up on|"
+    r"added|add|put away|put|store|save|restocked) (?P<items>.+)$"
+)
+REMOVE_COMMAND = re.compile(
+    r"^(?:(?:i |we )?(?:just |also )?(?:used up|used|finished off|finished|ate|drank|threw out|"
+    r"threw away|tossed|ran out of|have run out of|(?:am|are) out of|"
+    r"no longer have|do not have any)|delete|remove|take out|throw out|throw away|toss|"
+    r"clear|cross off) (?P<items>.+)$"
+)
+LIST_COMMAND = re.compile(
+    r"^(?:what (?:do|did) (?:i|we) have(?: left)?(?: in (?:my|the|our) \w+)?"
+    r"|what have (?:i|we) got(?: left)?"
+    r"|what (?:food|items|groceries|ingredients|stuff) do (?:i|we) have(?: left)?"
+    r"|what is (?:in|left in) (?:my|the|our) (?:inventory|pantry|fridge|kitchen|cupboard)"
+    r"|what is in stock"
+    r"|(?:list|show|read|tell)(?: me)?(?: out)?(?: everything in)? (?:my|the|our|what is in my) "
+    r"(?:inventory|pantry|groceries|items|food|fridge|stock)"
+    r"|(?:list|show|read)(?: me)? (?:everything|all items|all my items|what i have))$"
+)
+EXPIRING_WORDS = re.compile(
+    r"\b(?:expir\w*|going bad|go bad|goes bad|going off|go off|spoil\w*|use (?:up )?first|"
+    r"use soon|use up soon|past (?:its|their) date|out of date|best before|sell by|use by)\b"
+)
+EXPIRING_QUESTION = re.compile(r"^(?:what|which|is|are|anything|does|do|list|show|tell|check|read)\b")
+EXPIRY_HORIZONS = (("today", 0), ("tomorrow", 1), ("this week", 7), ("next week", 14), ("this month", 30))
+
+# Cooking talk means the user wants the assistant, not an inventory update
+BLOCKING_WORDS = re.compile(
+    r"\b(?:recipe|recipes|cook|cooking|make|making|bake|how|why|should|suggest|idea|ideas|"
+    r"tip|tips|substitute|replace|instead|dinner|lunch|breakfast|meal|calories|healthy|"
+    r"if|when|whether|need to|going to|want to|have to|might|maybe|shopping list|"
+    r"safe|eat|eating|smells?|still good)\b"
+)
+NOT_FOOD = {
+    "it", "that", "this", "them", "those", "these", "something", "stuff", "things", "everything",
+    "anything", "nothing", "groceries", "grocery", "food", "home", "back", "up", "a question",
+    "time", "here", "there", "ready", "done", "one", "some", "all", "item", "items", "inventory",
+}
+# Words that never appear in an item name ("got it thanks", "added you")
+NOT_FOOD_WORDS = {"it", "that", "this", "them", "thanks", "thank", "you", "me", "now", "yet", "again", "lot"}
+# An item's last word must be one of these (singular) words to be handled
+# locally; anything else ("a new phone", "a tea towel", "the kettle on") goes to Gemini
+FOOD_WORDS = set("""
+    almond apple apricot artichoke arugula asparagus avocado bacon bagel banana basil bay bean beef beet
+    berry biscuit blackberry blueberry bok bread breadcrumb breast brie brisket broccoli broth brownie
+    brussels bun burger burrito butter buttermilk cabbage cake candy cantaloupe caper carrot cashew
+    cauliflower celery cereal chard cheddar cheese cherry chestnut chicken chickpea chili chip chive
+    chocolate chop chorizo cider cilantro cinnamon clam clementine cocoa coconut cod coffee cookie corn
+    cornmeal couscous crab cracker cranberry cream croissant cucumber cumin cupcake currant curry cutlet
+    date dill dough doughnut donut drumstick duck dumpling edamame egg eggplant endive espresso fennel
+    feta fig fillet fish flour garlic gelato gin ginger gnocchi goat gouda granola grape grapefruit
+    gravy guacamole halibut ham hazelnut herb honey hummus ice jam jalapeno jelly jerky juice kale
+    ketchup kidney kimchi kiwi lamb lasagna leaf leek lemon lemonade lentil lettuce lime lobster loin
+    macaroni mackerel mango maple margarine marinara mayo mayonnaise meat meatball melon milk mince mint
+    miso mozzarella muffin mushroom mussel mustard naan noodle nut nutmeg oat oatmeal oil okra olive
+    omelette onion orange oregano oyster pancake paprika parmesan parsley parsnip pasta pastry pea peach
+    peanut pear pecan pepper pepperoni pesto pickle pie pineapple pistachio pita pizza plum pomegranate
+    popcorn pork potato prawn pretzel prosciutto pudding pumpkin quinoa radish raisin raspberry ravioli
+    rhubarb ribs rice ricotta roll rosemary rye sage salad salami salmon salsa salt sandwich sardine
+    sauce sausage scallion scallop seed sesame shallot shrimp soda sorbet soup sourdough soy spaghetti
+    spinach sprout squash steak stew stock strawberry sugar sushi sweetcorn syrup taco tahini tangerine
+    tea thigh thyme tilapia toast tofu tomato tortilla trout tuna turkey turnip vanilla veal vegetable
+    venison vinegar waffle walnut water watermelon wine wing wrap yam yeast yogurt yoghurt zucchini
+""".split())
+
+
+def normalize_utterance(text):
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"[^\w\s',&-]", " ", text)
+    words = [CONTRACTIONS.get(word, word) for word in text.split()]
+    text = " ".join(words)
+    text = re.sub(r"\s*,\s*", ", ", text).strip(" ,")
+    return FILLERS.sub("", text).strip(" ,")
+
+
+def parse_item(phrase):
+    """
+    "a dozen eggs" -> ("eggs", 12, True); "2 cartons of milk" -> ("milk", 2, True);
+    "the bananas" -> ("bananas", 1, False). The flag says whether a quantity was spoken.
+    """
+    phrase = DETERMINERS.sub("", phrase.strip(" ,")) + " "
+    quantity, explicit = 1, False
+    match = QUANTITY.match(phrase)
+    if match and phrase[match.end():].strip():
+        if match.group("half"):
+            quantity = 6
+        elif match.group("vague"):
+            quantity = NUMBER_WORDS[match.group("vague")]
+        else:
+            count = match.group("count")
+            quantity = int(count) if count.isdigit() else NUMBER_WORDS[count]
+            if match.group("dozen"):
+                quantity *= 12
+        explicit = True
+        phrase = phrase[match.end():]
+    unit = UNITS.match(phrase)
+    if unit:
+        phrase = phrase[unit.end():]
+    return DETERMINERS.sub("", phrase).strip(), quantity, explicit
+
+
+def is_food(name):
+    """The head noun decides: "cheddar cheese" is food, "cheese grater" is not."""
+    words = name.split()
+    return bool(words) and (canonical_name(words[-1]) in FOOD_WORDS or words[-1] in FOOD_WORDS)
+
+
+def _item_confidence(name):
+    words = name.split()
+    if not words or name in NOT_FOOD or len(words) > 4 or NOT_FOOD_WORDS.intersection(words):
+        return 0.0
+    if not is_food(name):
+        return 0.0
+    if any(not re.fullmatch(r"[a-z][a-z'-]*", word) for word in words):
+        return 0.3
+    return 1.0 if len(words) <= 2 else 0.8
+
+
+def _parse_items(items_text, partial_ok=True):
+    for suffix in (TIME_SUFFIX, PARTICLE_SUFFIX, PLACE_SUFFIX, TIME_SUFFIX):  # "... away to the fridge today"
+        items_text = suffix.sub("", items_text)
+    items, confidence = [], 1.0
+    for phrase in ITEM_SEPARATOR.split(items_text):
+        if not phrase.strip():
+            continue
+        name, quantity, explicit = parse_item(phrase)
+        confidence = min(confidence, _item_confidence(name))
+        if not partial_ok and PARTIAL_AMOUNT.match(phrase.strip()):
+            confidence = 0.0
+        items.append({"name": name, "quantity": quantity, "explicit_quantity": explicit})
+    return items, (confidence if items else 0.0)
+
+
+def classify_utterance(text, min_confidence=LOCAL_INTENT_MIN_CONFIDENCE):
+    """
+    Return {"intent": add|remove|list|expiring, "items": [...], "confidence": float}
+    for commands the inventory can answer by itself, or None to fall back to Gemini.
+    Items are {"name", "quantity", "explicit_quantity"} dicts (add/remove only);
+    expiring results also carry "within_days".
+    """
+    utterance = normalize_utterance(text)
+    if not utterance:
+        return None
+    result = None
+
+    if EXPIRING_WORDS.search(utterance):
+        if EXPIRING_QUESTION.match(utterance) and not BLOCKING_WORDS.search(utterance):
+            within_days = next((days for words, days in EXPIRY_HORIZONS if words in utterance),
+                               EXPIRING_WITHIN_DAYS)
+            result = {"intent": "expiring", "items": [], "confidence": 0.9, "within_days": within_days}
+    elif LIST_COMMAND.match(utterance):
+        result = {"intent": "list", "items": [], "confidence": 0.95}
+    elif not BLOCKING_WORDS.search(utterance):
+        for intent, pattern in (("add", ADD_COMMAND), ("remove", REMOVE_COMMAND)):
+            match = pattern.match(utterance)
+            if match:
+                # Adding "some milk" is one unit; removing it is an unknown amount
+                items, confidence = _parse_items(match.group("items"), partial_ok=intent == "add")
+                result = {"intent": intent, "items": items, "confidence": 0.9 * confidence}
+                break
+
+    if result is None or result["confidence"] < min_confidence:
+        return None
+    return result
+
+
+def join_words(words):
+    words = list(words)
+    if len(words) <= 1:
+        return "".join(words)
+    return f"{', '.join(words[:-1])} and {words[-1]}"
+
+
+def spoken_item(name, quantity):
+    return f"{quantity} {name}" if quantity and quantity > 1 else name
+
+
+def added_reply(items):
+    return f"Got it! I added {join_words(spoken_item(i['name'], i['quantity']) for i in items)} to your inventory."
+
+
+def removed_reply(removed, missing):
+    parts = []
+    if removed:
+        parts.append(f"Done, I removed {join_words(spoken_item(name, qty) for name, qty in removed)} from your inventory.")
+    if missing:
+        parts.append(f"I couldn't find {join_words(missing)} in your inventory.")
+    return " ".join(parts)
+
+
+def inventory_reply(summary):
+    """summary is [(name, total quantity)] in the order to read them out."""
+    if not summary:
+        return "Your inventory is empty right now."
+    spoken = [spoken_item(name, quantity) for name, quantity in summary[:LIST_SPOKEN_ITEMS]]
+    if len(summary) > LIST_SPOKEN_ITEMS:
+        spoken.append(f"{len(summary) - LIST_SPOKEN_ITEMS} more items")
+    return f"You have {join_words(spoken)}."
+
+
+def expiry_phrase(days):
+    if days < -1:
+        return f"expired {-days} days ago"
+    if days == -1:
+        return "expired yesterday"
+    if days == 0:
+        return "expires today"
+    if days == 1:
+        return "expires tomorrow"
+    return f"expires in {days} days"
+
+
+def expiring_reply(rows, today, within_days=EXPIRING_WITHIN_DAYS):
+    """rows are inventory rows with an expiry_date, soonest first."""
+    if not rows:
+        return f"Good news, nothing in your inventory expires in the next {within_days} days."
+    spoken = [f"{row.name} {expiry_phrase((row.expiry_date - today).days)}" for row in rows[:LIST_SPOKEN_ITEMS]]
+    if len(rows) > LIST_SPOKEN_ITEMS:
+        spoken.append(f"{len(rows) - LIST_SPOKEN_ITEMS} more items are close too")
+    return f"Use these soon: {join_words(spoken)}."
+
+
+# Replies that don't depend on the inventory; main warms their audio at startup
+FIXED_REPLIES = [inventory_reply([]), expiring_reply([], today=None)]
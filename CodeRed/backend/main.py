@@ -1,19 +1,45 @@
-from fastapi import FastAPI, Depends, Request
+from fastapi import FastAPI, Depends, Request, Response, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-from datetime import datetime
+from typing import List, Optional
+from datetime import date, datetime
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import base64
-
-from database import FoodItemDB, SessionLocal
+import json
+import os
+import asyncio
+import time
+from collections import Counter
+from urllib.parse import quote
+
+from fastapi.concurrency import run_in_threadpool
+from database import FoodItemDB, InventoryVersionDB, SessionLocal
 from models import FoodItem
-from gemini_utils import get_factual_recipe, get_kitchen_intent_response
+from crud import (
+    inventory_page, food_row, insert_food_rows, BulkInserter, BULK_INSERT_BATCH_SIZE,
+    remove_food_by_name, expiring_items, inventory_summary,
+)
+from gemini_utils import (
+    get_factual_recipe, get_kitchen_intent_response, stream_kitchen_intent_response,
+    OFF_TOPIC_REPLY,
+)
 
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 import io
 
-from elevenlabs_utils import text_to_speech_elevenlabs
+from elevenlabs_utils import (
+    text_to_speech_elevenlabs, stream_text_to_speech_elevenlabs,
+    tts_cache, warm_tts_cache,
+)
+from provider_clients import close_provider_clients
+from recipe_cache import RecipeCache, recipe_key
+from inventory_digest import InventoryDigest
+from image_pipeline import prepare_upload, shutdown_executor, PerceptualHashCache
+from job_queue import JobQueue, QueueFullError, TERMINAL_STATUSES
+from metrics import MetricsMiddleware, VOICE_INTENTS, stage_timer, render_metrics, render_stats
+from local_intents import (
+    classify_utterance, added_reply, removed_reply, inventory_reply, expiring_reply, FIXED_REPLIES,
+)
 
 
 
@@ -42,11 +68,47 @@ app.add_middleware(
     expose_headers=["*"],
     max_age=3600,
 )
+# Outermost, so request totals include CORS handling; see metrics.py
+app.add_middleware(MetricsMiddleware)
+
+# The frontend doesn't have accounts yet; everything it stores belongs to user "1"
+DEFAULT_USER_ID = "1"
+
+background_tasks = set()
+
+# Merged, expiry-sorted inventory text for prompts, kept up to date by every
+# endpoint that writes food_items and checked against inventory_versions before
+# use (see inventory_text); /generate_recipe results are cached under its hash.
+inventory_digest = InventoryDigest()
+recipe_cache = RecipeCache(
+    max_entries=int(os.getenv("RECIPE_CACHE_ENTRIES", "64")),
+    ttl=float(os.getenv("RECIPE_CACHE_TTL", "3600")),
+)
+# Vision results for recently scanned photos, matched by perceptual hash
+image_analysis_cache = PerceptualHashCache()
+# Answer simple inventory commands from food_items instead of calling Gemini
+LOCAL_INTENTS_ENABLED = os.getenv("LOCAL_INTENTS", "1") == "1"
 
 # Add a startup event to log CORS config
 @app.on_event("startup")
 async def startup_event():
     print("🚀 Server started with CORS enabled for localhost:3000")
+    with SessionLocal() as db:
+        versions = db.query(InventoryVersionDB.user_id, InventoryVersionDB.version).all()
+        rows = db.query(FoodItemDB.user_id, FoodItemDB.name, FoodItemDB.quantity, FoodItemDB.expiry_date).all()
+    inventory_digest.load(rows, versions)
+    if os.getenv("TTS_WARM_ON_STARTUP", "1") == "1":
+        # Runs in the background so a slow TTS provider doesn't delay startup
+        task = asyncio.create_task(warm_tts_cache([OFF_TOPIC_REPLY, *FIXED_REPLIES]))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    scan_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scan_jobs.stop()
+    await close_provider_clients()
+    shutdown_executor()
 
 # Pydantic model for voice command
 class VoiceMessage(BaseModel):
@@ -65,6 +127,7 @@ def add_food(item: FoodItem, db: Session = Depends(get_db)):
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
+    inventory_digest.add(db_item.user_id, [(db_item.name, db_item.quantity, db_item.expiry_date)])
     
     # Convert SQLAlchemy model to Pydantic model
     return FoodItem(
@@ -78,25 +141,79 @@ def add_food(item: FoodItem, db: Session = Depends(get_db)):
 
 
 @app.post("/add_food_bulk")
-def add_food_bulk(items: List[FoodItem], db: Session = Depends(get_db)):
-    db_items = [
-        FoodItemDB(
-            name=item.name,
-            quantity=item.quantity,
-            expiry_date=item.expiry_date,
-            user_id=item.user_id
-        )
-        for item in items
-    ]
-    db.add_all(db_items)
+def add_food_bulk(items: List[FoodItem], batch_size: int = BULK_INSERT_BATCH_SIZE, db: Session = Depends(get_db)):
+    ids = insert_food_rows(
+        db,
+        (food_row(item.name, item.quantity, item.expiry_date, item.user_id) for item in items),
+        batch_size,
+    )
     db.commit()
-    return {"message": "Bulk food items added!", "items": items}
+    for item in items:
+        inventory_digest.add(item.user_id, [(item.name, item.quantity, item.expiry_date)])
+    return {"message": "Bulk food items added!", "count": len(ids), "ids": ids}
+
+
+@app.post("/add_food_bulk_ndjson")
+async def add_food_bulk_ndjson(request: Request, batch_size: int = BULK_INSERT_BATCH_SIZE, db: Session = Depends(get_db)):
+    """
+    Streaming pantry import: one FoodItem JSON object per line
+    (Content-Type: application/x-ndjson). Rows are inserted batch by batch as
+    the body arrives, all in one transaction, so large imports are never
+    buffered in memory. Any bad line rolls the whole import back.
+    """
+    inserter = BulkInserter(db, batch_size)
+    units = Counter()  # (user_id, name, expiry_date) -> quantity, bounded by distinct items rather than lines
+    line_no = 0
+
+    async def ingest(line):
+        nonlocal line_no
+        line_no += 1
+        if not line.strip():
+            return
+        item = FoodItem(**json.loads(line))
+        units[item.user_id, item.name, item.expiry_date] += item.quantity
+        if inserter.add(food_row(item.name, item.quantity, item.expiry_date, item.user_id)):
+            await run_in_threadpool(inserter.flush)
+
+    try:
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                await ingest(line)
+        await ingest(pending)
+        await run_in_threadpool(inserter.flush)
+    except (ValueError, TypeError) as e:  # bad JSON or failed FoodItem validation
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=422, detail=f"line {line_no}: {e}")
+
+    await run_in_threadpool(db.commit)  # may wait out another writer's lock
+    for (user_id, name, expiry_date), quantity in units.items():
+        inventory_digest.add(user_id, [(name, quantity, expiry_date)])
+    return {"message": "Bulk food items added!", "count": len(inserter.ids), "ids": inserter.ids}
 
 
 @app.get("/food_inventory", response_model=List[FoodItem])
-def get_inventory(db: Session = Depends(get_db)):
-    items = db.query(FoodItemDB).all()
-    # Convert SQLAlchemy models to Pydantic models
+def get_inventory(
+    response: Response,
+    user_id: str = DEFAULT_USER_ID,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    A user's inventory ordered by expiry date. Pass `limit` to page through it;
+    the cursor for the next page comes back in the X-Next-Cursor header and
+    goes into `after`.
+    """
+    try:
+        items, next_cursor = inventory_page(db, user_id, limit, after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    # Convert row tuples to Pydantic models
     return [FoodItem(
                 id=item.id,
                 name=item.name,
@@ -112,70 +229,500 @@ def delete_food(item_id: int, db: Session = Depends(get_db)):
     if item is None:
         return {"error": "Item not found"}, 404
     
+    # attributes expire on commit
+    user_id, name, quantity, expiry_date = item.user_id, item.name, item.quantity, item.expiry_date
     db.delete(item)
     db.commit()
+    inventory_digest.remove(user_id, [(name, quantity, expiry_date)])
     return {"message": "Item deleted successfully", "item_id": item_id}
 
 from gemini_utils import get_factual_recipe
 
+
+def inventory_text(user_id):
+    """
+    The user's prompt inventory from the digest, first reloaded from food_items
+    if inventory_versions shows writes this process hasn't seen. One primary-key
+    lookup when current. Uses its own short session: the caller's may write later,
+    and a read transaction held across the model call would block that.
+    """
+    with SessionLocal() as db:
+        version = db.query(InventoryVersionDB.version).filter(InventoryVersionDB.user_id == str(user_id)).scalar() or 0
+        if not inventory_digest.is_current(user_id, version):
+            rows = (db.query(FoodItemDB.name, FoodItemDB.quantity, FoodItemDB.expiry_date)
+                    .filter(FoodItemDB.user_id == str(user_id)).all())
+            inventory_digest.reload(user_id, rows, version)
+    return inventory_digest.text(user_id)
+
+
 @app.get("/generate_recipe")
-def generate_recipe(db: Session = Depends(get_db)):
-    items = db.query(FoodItemDB).all()
-    ingredient_list = ", ".join([item.name for item in items])
-    suggestion = get_factual_recipe(ingredient_list)
+async def generate_recipe(response: Response, user_id: str = DEFAULT_USER_ID):
+    inventory = await run_in_threadpool(inventory_text, user_id)
+
+    async def generate():
+        return await get_factual_recipe(inventory)
+
+    suggestion, cache_status = await recipe_cache.get(recipe_key(user_id, inventory), generate)
+    response.headers["X-Recipe-Cache"] = cache_status
     return {"recipes": suggestion}
 
 
+@app.get("/recipe_cache_stats")
+def recipe_cache_stats(user_id: str = DEFAULT_USER_ID):
+    return {**recipe_cache.stats(), "key": recipe_key(user_id, inventory_text(user_id))}
+
+
+def add_items_by_name(db: Session, item_names, user_id, quantities=None):
+    if not item_names:
+        return
+    # quantity/expiry aren't in Gemini's items_to_add yet, so use defaults
+    quantities = quantities or [1] * len(item_names)
+    insert_food_rows(db, (food_row(item_name, quantity, None, user_id)
+                          for item_name, quantity in zip(item_names, quantities)))
+    db.commit()
+    inventory_digest.add(user_id, list(zip(item_names, quantities, [None] * len(item_names))))
+
+
+def answer_locally(db: Session, user_query, user_id):
+    """
+    Run an add/remove/list/expiring command straight against food_items.
+    Returns the same {"items_to_add", "reply"} shape as get_kitchen_intent_response,
+    or None when the classifier isn't confident and Gemini should answer.
+    """
+    intent = classify_utterance(user_query) if LOCAL_INTENTS_ENABLED else None
+    if intent is None:
+        VOICE_INTENTS.inc(1, "gemini", "")
+        return None
+    VOICE_INTENTS.inc(1, "local", intent["intent"])
+    items = intent["items"]
+
+    if intent["intent"] == "add":
+        names = [item["name"] for item in items]
+        add_items_by_name(db, names, user_id, [item["quantity"] for item in items])
+        return {"items_to_add": names, "reply": added_reply(items)}
+
+    if intent["intent"] == "remove":
+        removed, missing, taken = [], [], []
+        for item in items:
+            # "the bananas" removes them all, "two bananas" only two
+            count, rows = remove_food_by_name(db, user_id, item["name"],
+                                              item["quantity"] if item["explicit_quantity"] else None)
+            if count:
+                removed.append((item["name"], count))
+            else:
+                missing.append(item["name"])
+            taken.extend(rows)
+        db.commit()
+        inventory_digest.remove(user_id, taken)
+        return {"items_to_add": [], "reply": removed_reply(removed, missing)}
+
+    if intent["intent"] == "list":
+        return {"items_to_add": [], "reply": inventory_reply(inventory_summary(db, user_id))}
+
+    today = date.today()
+    rows = expiring_items(db, user_id, intent["within_days"], today)
+    return {"items_to_add": [], "reply": expiring_reply(rows, today, intent["within_days"])}
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def preferred_media_type(accept, offers):
+    """
+    Pick one of offers for an Accept header, honouring q-values; exact types
+    beat type/* beats */*, and ties go to the earlier offer. Falls back to
+    offers[0] when the header is missing or accepts none of them.
+    """
+    if not accept:
+        return offers[0]
+    ranges = {}
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges[media_type.lower()] = q
+
+    def quality(offer):
+        for candidate in (offer, offer.split("/")[0] + "/*", "*/*"):
+            if candidate in ranges:
+                return ranges[candidate]
+        return 0.0
+
+    best = max(offers, key=lambda offer: (quality(offer), -offers.index(offer)))
+    return best if quality(best) > 0 else offers[0]
+
+
+async def start_audio_stream(chunks):
+    """
+    Wait for the first audio chunk before the response starts, so a failing
+    TTS call still turns into an error status instead of a truncated 200.
+    """
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+
+    async def passthrough():
+        if first:
+            yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return passthrough()
+
+
+async def multipart_reply(boundary, metadata, audio):
+    yield (f"--{boundary}\r\n"
+           'Content-Disposition: form-data; name="metadata"\r\n'
+           "Content-Type: application/json\r\n\r\n"
+           f"{json.dumps(metadata)}\r\n"
+           f"--{boundary}\r\n"
+           'Content-Disposition: form-data; name="audio"; filename="reply.mp3"\r\n'
+           "Content-Type: audio/mpeg\r\n\r\n").encode("utf-8")
+    async for chunk in audio:
+        yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+
+def reply_metadata_header(metadata, limit):
+    """
+    X-Reply-Metadata for audio/mpeg replies: URL-encoded JSON with added_items,
+    text_length and as much of the text as fits in `limit` bytes, since proxies
+    reject large headers. "truncated" tells the client the full text is only
+    in the multipart and JSON formats.
+    """
+    text = metadata["text"]
+    header = {"added_items": metadata["added_items"], "text_length": len(text), "truncated": False, "text": text}
+    value = quote(json.dumps(header))
+    while len(value) > limit and header["text"]:
+        header["text"] = text[:max(len(header["text"]) * limit // len(value) - 1, 0)]
+        header["truncated"] = True
+        value = quote(json.dumps(header))
+    return value
+
+
+# First entry is the default, for clients that send no Accept header or */*
+CONVERSE_MEDIA_TYPES = ["application/json", "audio/mpeg", "multipart/form-data"]
+# nginx's default proxy_buffer_size (4 or 8 KB) must hold all response headers
+REPLY_METADATA_HEADER_BYTES = int(os.getenv("REPLY_METADATA_HEADER_BYTES", "2048"))
+
+
 @app.post("/kitchen_converse")
 async def kitchen_converse(request: Request, db: Session = Depends(get_db)):
+    """
+    One voice turn. The response format follows the Accept header:
+      application/json (default) -> {"text", "audio_base64", "added_items"}
+      audio/mpeg                 -> the mp3 itself; added_items and the text (cut
+                                    to REPLY_METADATA_HEADER_BYTES) are in the
+                                    X-Reply-Metadata header as URL-encoded JSON
+      multipart/form-data        -> a "metadata" JSON part, then an "audio" mp3 part
+                                    (fetch's response.formData() reads it)
+    The binary formats skip base64 (a third smaller on the wire) and pass the
+    TTS stream straight through instead of holding the whole clip in memory.
+    """
     payload = await request.json()
     user_query = payload.get("user_query") or payload.get("message", "")
+    user_id = str(payload.get("user_id") or DEFAULT_USER_ID)
 
-    items = db.query(FoodItemDB).all()
-    ingredient_list = ", ".join([item.name for item in items]) if items else "no ingredients currently stored"
-
-    intent_info = get_kitchen_intent_response(user_query, ingredient_list)
-
-    # Add to DB if Gemini detects items
-    if intent_info["items_to_add"]:
-        for item_name in intent_info["items_to_add"]:
-            db_item = FoodItemDB(
-                name=item_name,
-                quantity=1,  # You can parse quantity, too, if Gemini outputs it!
-                expiry_date=None,  # Can ask Gemini for "standard" expiry per item
-                user_id=1       # Set user_id appropriately
-            )
-            db.add(db_item)
-        db.commit()
+    # Classification and the DB writes are synchronous; keep them off the event loop
+    intent_info = await run_in_threadpool(answer_locally, db, user_query, user_id)
+    intent_source = "local" if intent_info is not None else "gemini"
+    if intent_info is None:
+        inventory = await run_in_threadpool(inventory_text, user_id)
+        intent_info = await get_kitchen_intent_response(user_query, inventory)
+
+        # Add to DB if Gemini detects items
+        await run_in_threadpool(add_items_by_name, db, intent_info["items_to_add"], user_id)
+
+    media_type = preferred_media_type(request.headers.get("accept"), CONVERSE_MEDIA_TYPES)
+    headers = {"Vary": "Accept", "X-Intent-Source": intent_source}
+    metadata = {"text": intent_info["reply"], "added_items": intent_info["items_to_add"]}
+
+    if media_type == "audio/mpeg":
+        audio = await start_audio_stream(stream_text_to_speech_elevenlabs(intent_info["reply"]))
+        headers["X-Reply-Metadata"] = reply_metadata_header(metadata, REPLY_METADATA_HEADER_BYTES)
+        return StreamingResponse(audio, media_type="audio/mpeg", headers=headers)
+
+    if media_type == "multipart/form-data":
+        audio = await start_audio_stream(stream_text_to_speech_elevenlabs(intent_info["reply"]))
+        boundary = os.urandom(16).hex()
+        return StreamingResponse(multipart_reply(boundary, metadata, audio),
+                                 media_type=f"multipart/form-data; boundary={boundary}", headers=headers)
 
-    audio_bytes = text_to_speech_elevenlabs(intent_info["reply"])
-    audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
+    audio_bytes = await text_to_speech_elevenlabs(intent_info["reply"])
+    with stage_timer("encode"):
+        audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
 
     return JSONResponse({
         "text": intent_info["reply"],
         "audio_base64": audio_base64,
         "added_items": intent_info["items_to_add"]
-    })
+    }, headers=headers)
+
+
+# Sentences synthesized ahead of the one being sent on /kitchen_converse_stream
+TTS_STREAM_CONCURRENCY = int(os.getenv("TTS_STREAM_CONCURRENCY", "3"))
+_END = object()
+
+
+async def pipelined_speech(events, concurrency=TTS_STREAM_CONCURRENCY):
+    """
+    Read reply events ({"items_to_add"} / {"sentence"}) in a producer task and
+    start TTS for each sentence as soon as it is complete, at most
+    `concurrency` sentences ahead of the one being sent, so neither the model
+    stream nor the next sentence's TTS waits for the client. Yields
+    ("items", [...]), then ("text", sentence) and its ("audio", chunk)s in
+    reply order. Failures in either stage are re-raised here.
+    """
+    pending = asyncio.Queue()  # ("items", ...) / ("sentence", text, chunks), _END or an exception
+    sent = []  # one Event per sentence, set once its audio has gone out
+    tasks = set()
+
+    async def speak(index, sentence, chunks):
+        try:
+            if index >= concurrency:
+                await sent[index - concurrency].wait()
+            async for chunk in stream_text_to_speech_elevenlabs(sentence):
+                chunks.put_nowait(chunk)
+            chunks.put_nowait(_END)
+        except Exception as e:
+            chunks.put_nowait(e)
+
+    async def produce():
+        try:
+            async for event in events:
+                if "items_to_add" in event:
+                    pending.put_nowait(("items", event["items_to_add"]))
+                    continue
+                chunks = asyncio.Queue()
+                sent.append(asyncio.Event())
+                tasks.add(asyncio.create_task(speak(len(sent) - 1, event["sentence"], chunks)))
+                pending.put_nowait(("sentence", event["sentence"], chunks))
+            pending.put_nowait(_END)
+        except Exception as e:
+            pending.put_nowait(e)
+
+    tasks.add(asyncio.create_task(produce()))
+    try:
+        index = 0
+        while (item := await pending.get()) is not _END:
+            if isinstance(item, Exception):
+                raise item
+            if item[0] == "items":
+                yield item
+                continue
+            _, sentence, chunks = item
+            yield "text", sentence
+            while (chunk := await chunks.get()) is not _END:
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield "audio", chunk
+            sent[index].set()
+            index += 1
+    finally:
+        # Client gone or a stage failed: stop the model stream and any TTS still running
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/kitchen_converse_stream")
+async def kitchen_converse_stream(request: Request, db: Session = Depends(get_db)):
+    """
+    Streaming version of /kitchen_converse (Server-Sent Events).
+    Events, in order:
+      items -> {"added_items": [...]}, sent as soon as Gemini has emitted the list
+      text  -> {"text": "..."}, one per sentence of the reply
+      audio -> {"audio_base64": "..."}, mp3 chunks for the preceding sentence
+      done  -> {"text": full reply}
+    Each sentence goes to TTS as soon as it is complete, while Gemini keeps
+    streaming, so the first audio arrives long before Gemini has finished the
+    whole reply and later sentences are already synthesized when their turn
+    comes (see pipelined_speech).
+    """
+    payload = await request.json()
+    user_query = payload.get("user_query") or payload.get("message", "")
+    user_id = str(payload.get("user_id") or DEFAULT_USER_ID)
+
+    local_reply = await run_in_threadpool(answer_locally, db, user_query, user_id)
+    if local_reply is None:
+        inventory = await run_in_threadpool(inventory_text, user_id)
+
+    async def local_events():
+        yield {"items_to_add": local_reply["items_to_add"]}
+        yield {"sentence": local_reply["reply"]}
+
+    async def event_stream():
+        sentences = []
+        if local_reply is not None:
+            events = local_events()  # items were already saved by answer_locally
+        else:
+            events = stream_kitchen_intent_response(user_query, inventory)
+        async for kind, value in pipelined_speech(events):
+            if kind == "items":
+                if local_reply is None:
+                    await run_in_threadpool(add_items_by_name, db, value, user_id)
+                yield sse_event("items", {"added_items": value})
+            elif kind == "text":
+                sentences.append(value)
+                yield sse_event("text", {"text": value})
+            else:
+                with stage_timer("encode"):
+                    event = sse_event("audio", {"audio_base64": base64.b64encode(value).decode("utf-8")})
+                yield event
+
+        yield sse_event("done", {"text": " ".join(sentences)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"X-Intent-Source": "local" if local_reply is not None else "gemini"})
+
+
+@app.get("/tts_cache_stats")
+def tts_cache_stats():
+    return tts_cache.stats()
 
 from fastapi import UploadFile, File
 
-@app.post("/scan_grocery_image")
-async def scan_grocery_image(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    image_bytes = await file.read()
+async def run_grocery_scan(prepared, user_id, progress=None):
+    """
+    Vision analysis of a preprocessed image (or a perceptual-hash cache hit),
+    then one batched insert of the detected items. Shared by the inline
+    endpoint and the background job.
+    """
     from gemini_utils import analyze_grocery_image
-
-    analysis = analyze_grocery_image(image_bytes)
+    progress = progress or (lambda stage, **details: None)
+    image_stats = dict(prepared["stats"])
+
+    stage = time.perf_counter()
+    analysis = image_analysis_cache.get(prepared["phash"])
+    image_stats["cache_hit"] = analysis is not None
+    if analysis is None:
+        progress("analyzing")
+        analysis = await analyze_grocery_image(prepared["data"], prepared["mime_type"])
+        if analysis["parsed"]:
+            image_analysis_cache.put(prepared["phash"], analysis)
+    image_stats["vision_ms"] = round((time.perf_counter() - stage) * 1000, 2)
     detected_items = analysis["items"]  # Each item should include name, quantity, and estimated expiry
 
     # Add detected items to DB
-    for entry in detected_items:
-        db_item = FoodItemDB(
-            name=entry["name"],
-            quantity=entry.get("quantity", 1),
-            expiry_date=entry.get("expiry_date"),
-            user_id=1  # you can set user_id as needed
-        )
-        db.add(db_item)
-    db.commit()
+    progress("saving", items=len(detected_items))
+    stage = time.perf_counter()
+
+    def save():
+        with SessionLocal() as db:
+            rows = [food_row(entry["name"], entry.get("quantity", 1), entry.get("expiry_date"), user_id)
+                    for entry in detected_items]
+            insert_food_rows(db, rows)
+            db.commit()
+        # Here rather than after the await: a job timeout cancels the caller,
+        # but the threadpool commit still lands and the digest must follow it
+        inventory_digest.add(user_id, rows)
+
+    await run_in_threadpool(save)
+    image_stats["db_ms"] = round((time.perf_counter() - stage) * 1000, 2)
+
+    return {"items_added": detected_items, "raw_ai_response": analysis["raw_text"], "image_stats": image_stats}
+
+
+async def grocery_scan_job(job):
+    return await run_grocery_scan(job.payload["prepared"], job.payload["user_id"], job.progress)
 
-    return {"items_added": detected_items, "raw_ai_response": analysis["raw_text"]}
+
+# Worker count doubles as the cap on concurrent vision calls (JOB_MAX_CONCURRENT)
+scan_jobs = JobQueue({"grocery_scan": grocery_scan_job})
+
+
+@app.post("/scan_grocery_image")
+async def scan_grocery_image(
+    response: Response,
+    file: UploadFile = File(...),
+    user_id: str = Form(DEFAULT_USER_ID),
+    background: bool = False,
+):
+    """
+    Detect groceries in a photo and add them to the inventory.
+    With ?background=true the analysis is queued instead: the response is a
+    202 with a job id, and the result is fetched from /jobs/{job_id} (or
+    streamed from /jobs/{job_id}/events).
+    """
+    start = time.perf_counter()
+
+    # Orient, downscale and re-encode in the image worker pool; the upload is
+    # read from Starlette's spooled temp file rather than copied into memory here
+    try:
+        with stage_timer("image"):
+            prepared = await prepare_upload(file)
+    except Exception as e:
+        print(f"Error preprocessing image: {e}")
+        return {"items_added": [], "raw_ai_response": f"Error: {str(e)}"}
+
+    if background:
+        try:
+            job = scan_jobs.submit("grocery_scan", {"prepared": prepared, "user_id": user_id})
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        response.status_code = 202
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/jobs/{job.id}",
+            "events_url": f"/jobs/{job.id}/events",
+        }
+
+    result = await run_grocery_scan(prepared, user_id)
+    image_stats = result["image_stats"]
+    image_stats["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    print(f"📷 Scan: {image_stats['original_bytes']} -> {image_stats['processed_bytes']} bytes, "
+          f"cache_hit={image_stats['cache_hit']}, {image_stats['total_ms']} ms")
+    return result
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = scan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """SSE stream of a job's progress; the last event is done/failed/timeout with the full job."""
+    job = scan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        seen = 0
+        while True:
+            events = await job.wait_for_events(seen)
+            seen += len(events)
+            for event in events:
+                if event["stage"] in TERMINAL_STATUSES:
+                    yield sse_event(event["stage"], job.to_dict())
+                    return
+                yield sse_event("progress", event)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.get("/job_queue_stats")
+def job_queue_stats():
+    return scan_jobs.stats()
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: request/stage latency histograms, payload bytes and cache/queue stats."""
+    return PlainTextResponse(render_metrics([
+        *render_stats("tts_cache", tts_cache.stats()),
+        *render_stats("recipe_cache", recipe_cache.stats()),
+        *render_stats("image_cache", image_analysis_cache.stats()),
+        *render_stats("job_queue", scan_jobs.stats()),
+    ]), media_type="text/plain; version=0.0.4")
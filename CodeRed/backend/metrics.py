@@ -0,0 +1,324 @@
+# metrics.py
+"""
+Request latency instrumentation, exported in Prometheus text format on /metrics.
+
+MetricsMiddleware gives every request a request id and a trace that lives in a
+contextvar; the DB, LLM, TTS and encode stages add their time to it with
+stage_timer(). When the response is finished the trace feeds the histograms
+below and is queued as one JSON log line, which a background thread formats
+and writes so the request doesn't wait on the log stream. Stages never nest,
+so the stage times of a request add up to at most its total; the remainder is
+reported as "other" (routing, validation, serialization, sending). The one
+exception is /kitchen_converse_stream, which runs Gemini and TTS side by side:
+there stage times are summed work (up to TTS_STREAM_CONCURRENCY sentences are
+synthesized at once), so they can exceed the total and "other" bottoms out at 0.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+TRACE_LOG = os.getenv("TRACE_LOG", "1") == "1"
+
+# Upper bounds in seconds; sized for ~1 ms DB reads up to multi-second LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _TraceFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg)  # trace records carry the dict itself
+
+
+class _TraceQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        return record  # formatting is left to the listener thread
+
+
+# Trace records are dicts; the request only enqueues them and trace_listener
+# serializes and writes them to trace_handler (stderr)
+trace_logger = logging.getLogger("codered.trace")
+trace_handler = logging.StreamHandler()
+trace_handler.setFormatter(_TraceFormatter())
+trace_listener = None
+if TRACE_LOG and not trace_logger.handlers:
+    _trace_queue = queue.SimpleQueue()
+    trace_logger.addHandler(_TraceQueueHandler(_trace_queue))
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+    trace_listener = logging.handlers.QueueListener(_trace_queue, trace_handler)
+    trace_listener.start()
+    atexit.register(trace_listener.stop)  # flush what is still queued
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = _labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {values[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *labels):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for labels, value in sorted(series.items()):
+            lines.append(f"{self.name}{{{_labels(self.labelnames, labels)}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+REQUEST_DURATION = Histogram(
+    "codered_request_duration_seconds", "Total request latency, until the last body byte is sent.",
+    ("endpoint", "method", "status"),
+)
+STAGE_DURATION = Histogram(
+    "codered_stage_duration_seconds", "Time spent in one stage (db, llm, tts, encode) of a request.",
+    ("endpoint", "stage", "model"),
+)
+REQUEST_BYTES = Counter("codered_request_bytes_total", "Request body bytes received.", ("endpoint",))
+RESPONSE_BYTES = Counter("codered_response_bytes_total", "Response body bytes sent.", ("endpoint",))
+PROVIDER_BYTES = Counter(
+    "codered_provider_bytes_total", "Bytes exchanged with upstream providers.", ("provider", "direction"),
+)
+VOICE_INTENTS = Counter(
+    "codered_voice_intents_total", "Voice turns by who answered them (local rules or gemini).", ("source", "intent"),
+)
+REGISTRY = [REQUEST_DURATION, STAGE_DURATION, REQUEST_BYTES, RESPONSE_BYTES, PROVIDER_BYTES, VOICE_INTENTS]
+
+
+class Trace:
+    def __init__(self, request_id, scope):
+        self.request_id = request_id
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self._scope = scope
+        self.stages = {}  # stage -> seconds
+        self.calls = {}  # stage -> number of timed calls
+        self.models = {}  # (stage, model) -> seconds, observed once per request
+        self.finished = False
+
+    def add(self, stage, seconds, model=""):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        self.models[stage, model] = self.models.get((stage, model), 0.0) + seconds
+
+    @property
+    def endpoint(self):
+        # The router adds the matched route to the scope; its path template keeps
+        # label cardinality bounded (/jobs/{job_id}, not one series per job)
+        route = self._scope.get("route")
+        return route.path if route is not None else "unmatched"
+
+
+# Copied into threadpool calls and tasks, so sync endpoints and their DB
+# queries record into the trace of the request that started them
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def record_stage(stage, seconds, model=""):
+    trace = current_trace.get()
+    if trace is None:
+        STAGE_DURATION.observe(seconds, "background", stage, model)
+    elif trace.finished:  # a task the request started, e.g. a recipe cache refresh
+        STAGE_DURATION.observe(seconds, trace.endpoint, stage, model)
+    else:
+        trace.add(stage, seconds, model)  # into the histogram when the request finishes
+
+
+class _StageTimer:
+    __slots__ = ("stage", "model", "elapsed", "_start")
+
+    def __init__(self, stage, model):
+        self.stage = stage
+        self.model = model
+        self.elapsed = 0.0
+        self._start = None
+
+    @contextmanager
+    def paused(self):
+        """Exclude a span from the stage, e.g. a streaming generator's yield to its consumer."""
+        self.elapsed += time.perf_counter() - self._start
+        try:
+            yield
+        finally:
+            self._start = time.perf_counter()
+
+
+@contextmanager
+def stage_timer(stage, model=""):
+    timer = _StageTimer(stage, model)
+    timer._start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.elapsed += time.perf_counter() - timer._start
+        record_stage(stage, timer.elapsed, model)
+
+
+def count_provider_bytes(provider, sent, received):
+    PROVIDER_BYTES.inc(sent, provider, "sent")
+    PROVIDER_BYTES.inc(received, provider, "received")
+
+
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    record_stage("db", time.perf_counter() - conn.info["query_start"].pop())
+
+
+ENGINE_EVENTS = (("before_cursor_execute", _start_query), ("after_cursor_execute", _end_query))
+
+
+def instrument_engine(engine):
+    """Time every SQL statement run on engine as the "db" stage."""
+    for name, listener in ENGINE_EVENTS:
+        event.listen(engine, name, listener)
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no per-request task or body buffering, unlike
+    BaseHTTPMiddleware), so streamed responses are passed through untouched.
+    An incoming X-Request-ID is reused, otherwise one is generated; it is
+    echoed in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or os.urandom(8).hex()
+        trace = Trace(request_id, scope)
+        token = current_trace.set(trace)
+        sizes = {"request": 0, "response": 0}
+        status = 500
+
+        async def receive_counted():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def send_traced(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []),
+                                      (b"x-request-id", request_id.encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_counted, send_traced)
+        finally:
+            current_trace.reset(token)
+            self._finish(trace, status, time.perf_counter() - start, sizes)
+
+    @staticmethod
+    def _finish(trace, status, total, sizes):
+        endpoint = trace.endpoint
+        trace.finished = True
+        REQUEST_DURATION.observe(total, endpoint, trace.method, str(status))
+        for (stage, model), seconds in trace.models.items():
+            STAGE_DURATION.observe(seconds, endpoint, stage, model)
+        REQUEST_BYTES.inc(sizes["request"], endpoint)
+        RESPONSE_BYTES.inc(sizes["response"], endpoint)
+        if TRACE_LOG:
+            staged = sum(trace.stages.values())
+            trace_logger.info({
+                "request_id": trace.request_id,
+                "method": trace.method,
+                "path": trace.path,
+                "endpoint": endpoint,
+                "status": status,
+                "total_ms": round(total * 1000, 3),
+                "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in trace.stages.items()},
+                "calls": trace.calls,
+                "other_ms": round(max(total - staged, 0.0) * 1000, 3),
+                "request_bytes": sizes["request"],
+                "response_bytes": sizes["response"],
+            })
+
+
+def render_stats(prefix, stats):
+    """Expose a component's stats() dict (cache hits, queue depth, ...) as gauges."""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        name = f"codered_{prefix}_{key}"
+        lines.extend([f"# TYPE {name} gauge", f"{name} {value}"])
+    return lines
+
+
+def render_metrics(extra_lines=()):
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,148 @@
+# provider_clients.py
+"""
+Shared async HTTP clients for the outbound providers (Gemini, ElevenLabs).
+Each provider gets one keep-alive connection pool, a timeout, a cap on
+in-flight calls and retry with exponential backoff, so slow upstream calls
+never block the event loop and never pay for a fresh TCP+TLS handshake.
+"""
+import asyncio
+import os
+import random
+from contextlib import asynccontextmanager
+
+import httpx
+from dotenv import load_dotenv
+
+from metrics import count_provider_bytes
+
+load_dotenv()
+
+USE_FAKE_PROVIDERS = os.getenv("FAKE_PROVIDERS") == "1"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    def __init__(self, provider, status_code, detail=""):
+        self.provider = provider
+        self.status_code = status_code
+        super().__init__(f"{provider} API error: {status_code} {detail}".strip())
+
+
+class ProviderClient:
+    def __init__(self, name, base_url, headers=None, timeout=30.0, max_concurrency=8,
+                 max_connections=20, max_retries=2, backoff=0.5, transport=None):
+        self.name = name
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers or {},
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    async def _sleep_before_retry(self, attempt):
+        delay = self.backoff * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    async def post(self, path, **kwargs):
+        """POST and return the full response, retrying transient failures."""
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                last_try = attempt == self.max_retries
+                try:
+                    response = await self._client.post(path, **kwargs)
+                except httpx.TransportError:
+                    if last_try:
+                        raise
+                else:
+                    if response.status_code == 200:
+                        count_provider_bytes(self.name, len(response.request.content), len(response.content))
+                        return response
+                    if response.status_code not in RETRY_STATUSES or last_try:
+                        raise ProviderError(self.name, response.status_code, response.text[:200])
+                print(f"⚠️ {self.name} call failed, retrying ({attempt + 1}/{self.max_retries})")
+                await self._sleep_before_retry(attempt)
+
+    @asynccontextmanager
+    async def stream(self, path, **kwargs):
+        """
+        POST and yield a streaming response. Retries only happen before the
+        first byte is handed to the caller.
+        """
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                last_try = attempt == self.max_retries
+                try:
+                    request = self._client.build_request("POST", path, **kwargs)
+                    response = await self._client.send(request, stream=True)
+                except httpx.TransportError:
+                    if last_try:
+                        raise
+                else:
+                    if response.status_code == 200:
+                        try:
+                            yield response
+                        finally:
+                            await response.aclose()
+                            count_provider_bytes(self.name, len(request.content), response.num_bytes_downloaded)
+                        return
+                    detail = (await response.aread()).decode("utf-8", "replace")[:200]
+                    await response.aclose()
+                    if response.status_code not in RETRY_STATUSES or last_try:
+                        raise ProviderError(self.name, response.status_code, detail)
+                print(f"⚠️ {self.name} stream failed, retrying ({attempt + 1}/{self.max_retries})")
+                await self._sleep_before_retry(attempt)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_clients = {}
+
+
+def _transport():
+    if USE_FAKE_PROVIDERS:
+        from fake_providers import fake_transport
+        return fake_transport()
+    return None
+
+
+def get_gemini_client():
+    if "gemini" not in _clients:
+        _clients["gemini"] = ProviderClient(
+            "Gemini",
+            base_url=os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com"),
+            headers={"x-goog-api-key": os.getenv("GEMINI_API_KEY") or ""},
+            timeout=float(os.getenv("GEMINI_TIMEOUT", "60")),
+            max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+            max_connections=int(os.getenv("GEMINI_MAX_CONNECTIONS", "20")),
+            max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "2")),
+            transport=_transport(),
+        )
+    return _clients["gemini"]
+
+
+def get_elevenlabs_client():
+    if "elevenlabs" not in _clients:
+        _clients["elevenlabs"] = ProviderClient(
+            "ElevenLabs",
+            base_url=os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io"),
+            headers={"xi-api-key": os.getenv("ELEVENLABS_API_KEY") or ""},
+            timeout=float(os.getenv("ELEVENLABS_TIMEOUT", "30")),
+            max_concurrency=int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "8")),
+            max_connections=int(os.getenv("ELEVENLABS_MAX_CONNECTIONS", "10")),
+            max_retries=int(os.getenv("ELEVENLABS_MAX_RETRIES", "2")),
+            transport=_transport(),
+        )
+    return _clients["elevenlabs"]
+
+
+async def close_provider_clients():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
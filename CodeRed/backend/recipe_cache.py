@@ -0,0 +1,92 @@
+# recipe_cache.py
+"""
+Recipe results cached under a hash of the inventory text the prompt is built
+from. That text is the incrementally maintained InventoryDigest, so a cache
+hit needs neither a table scan nor a Gemini call.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import date
+
+
+def recipe_key(user_id, inventory, today=None):
+    """
+    Cache key for a recipe prompt: the user's InventoryDigest text (names,
+    quantities and expiry dates) plus the date the prompt was built on, so
+    partial removals, quantity changes and day rollover all miss.
+    """
+    material = f"{today or date.today()}\n{inventory}".encode("utf-8")
+    return f"{user_id}:{hashlib.blake2b(material, digest_size=8).hexdigest()}"
+
+
+class RecipeCache:
+    def __init__(self, max_entries=64, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl  # seconds before an entry is served stale and refreshed
+        self._entries = OrderedDict()  # recipe_key -> (recipe, created_at)
+        self._inflight = {}
+        self._refresh_tasks = set()
+        self.metrics = {"hits": 0, "stale_hits": 0, "misses": 0, "collapsed": 0, "refreshes": 0}
+
+    def _store(self, key, recipe):
+        self._entries[key] = (recipe, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _generate(self, key, generate):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            recipe = await generate()
+            self._store(key, recipe)
+            future.set_result(recipe)
+            return recipe
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    def _refresh_in_background(self, key, generate):
+        if key in self._inflight:
+            return
+        self.metrics["refreshes"] += 1
+        task = asyncio.create_task(self._generate(key, generate))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task):
+        self._refresh_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️ Background recipe refresh failed: {task.exception()}")
+
+    async def get(self, key, generate):
+        """
+        Return (recipe, status) for a recipe_key, where status is one of
+        hit, stale, collapsed or miss. Only a miss awaits `generate()`; a stale
+        entry is returned immediately and regenerated in the background.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            recipe, created_at = entry
+            if time.monotonic() - created_at > self.ttl:
+                self.metrics["stale_hits"] += 1
+                self._refresh_in_background(key, generate)
+                return recipe, "stale"
+            self.metrics["hits"] += 1
+            return recipe, "hit"
+
+        if key in self._inflight:
+            self.metrics["collapsed"] += 1
+            return await asyncio.shield(self._inflight[key]), "collapsed"
+
+        self.metrics["misses"] += 1
+        return await self._generate(key, generate), "miss"
+
+    def stats(self):
+        return {**self.metrics, "entries": len(self._entries)}
@@ -0,0 +1,202 @@
+# tts_cache.py
+"""
+Content-addressed cache for synthesized speech.
+Entries are keyed by (normalized text, voice_id, voice_settings) and kept in
+a bounded in-memory LRU backed by a size-capped directory on disk.
+Concurrent requests for the same key share one upstream call.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text, voice_id, voice_settings):
+    material = json.dumps([normalize_text(text), voice_id, voice_settings], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, max_memory_bytes=32 * 1024 * 1024, disk_dir=None, max_disk_bytes=256 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight = {}
+        self._disk_lock = threading.Lock()  # writes and eviction run in several to_thread workers
+        self.metrics = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "collapsed": 0,   # callers that waited on someone else's upstream call
+            "bytes_served_from_cache": 0,
+            "bytes_fetched": 0,
+            "evictions": 0,
+            "uncacheable": 0,  # streamed clips larger than either tier could hold
+            "disk_errors": 0,  # failed disk writes; the audio is still served
+        }
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    # -- memory tier ---------------------------------------------------------
+
+    def _remember(self, key, audio):
+        if len(audio) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.metrics["evictions"] += 1
+
+    # -- disk tier -----------------------------------------------------------
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.mp3")
+
+    def _read_disk(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+            os.utime(self._path(key))  # mtime doubles as last-used time for eviction
+            return audio
+        except OSError:
+            return None
+
+    def _write_disk(self, key, audio):
+        with self._disk_lock:
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, self._path(key))
+
+            entries = []
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".mp3"):
+                    try:
+                        stat = os.stat(os.path.join(self.disk_dir, name))
+                    except FileNotFoundError:  # removed by another process sharing the directory
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    # -- public API ----------------------------------------------------------
+
+    @property
+    def max_entry_bytes(self):
+        """Largest clip worth collecting for the cache; anything bigger is only passed through."""
+        return max(self.max_memory_bytes, self.max_disk_bytes if self.disk_dir else 0)
+
+    async def lookup(self, key):
+        """Return cached audio (memory first, then disk) or None."""
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.metrics["memory_hits"] += 1
+            self.metrics["bytes_served_from_cache"] += len(audio)
+            return audio
+        if self.disk_dir:
+            audio = await asyncio.to_thread(self._read_disk, key)
+            if audio is not None:
+                self._remember(key, audio)
+                self.metrics["disk_hits"] += 1
+                self.metrics["bytes_served_from_cache"] += len(audio)
+                return audio
+        return None
+
+    async def store(self, key, audio):
+        self._remember(key, audio)
+        if self.disk_dir:
+            try:
+                await asyncio.to_thread(self._write_disk, key, audio)
+            except OSError as e:
+                # The disk tier is best-effort; never fail the TTS call over it
+                self.metrics["disk_errors"] += 1
+                print(f"⚠️ TTS disk cache write failed: {e}")
+
+    @asynccontextmanager
+    async def fetching(self, key):
+        """
+        Claim the upstream fetch for key. The caller sets entry["audio"];
+        on exit it is cached and handed to every request that waited on it.
+        entry["audio"] = None means the clip was not kept (too large to
+        cache); waiters then get None and fetch it themselves.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.metrics["misses"] += 1
+        entry = {}
+        try:
+            yield entry
+            audio = entry["audio"]
+            if audio is None:
+                self.metrics["uncacheable"] += 1
+            else:
+                self.metrics["bytes_fetched"] += len(audio)
+                await self.store(key, audio)
+            future.set_result(audio)
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            # Uncacheable clips are refetched by their waiters concurrently, so a
+            # later call may have claimed the key since; only release our own claim
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def is_fetching(self, key):
+        return key in self._inflight
+
+    async def wait_for(self, key):
+        """Wait for another caller's in-flight fetch of key; None if it wasn't kept."""
+        self.metrics["collapsed"] += 1
+        return await asyncio.shield(self._inflight[key])
+
+    async def get_or_fetch(self, key, fetch):
+        """
+        Return the audio for key, calling `await fetch()` only on a miss.
+        Identical concurrent misses are collapsed into a single fetch.
+        """
+        audio = await self.lookup(key)
+        if audio is not None:
+            return audio
+        if self.is_fetching(key):
+            audio = await self.wait_for(key)
+            if audio is not None:
+                return audio
+        async with self.fetching(key) as entry:
+            entry["audio"] = await fetch()
+        return entry["audio"]
+
+    def stats(self):
+        lookups = self.metrics["memory_hits"] + self.metrics["disk_hits"] + self.metrics["misses"]
+        hits = lookups - self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
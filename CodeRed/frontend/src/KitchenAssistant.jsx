@@ -23,7 +23,8 @@ const KitchenAssistant = () => {
     try {
       const response = await fetch('http://localhost:8000/kitchen_converse', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        // Binary audio part instead of base64 in JSON
+        headers: { 'Content-Type': 'application/json', 'Accept': 'multipart/form-data' },
         body: JSON.stringify({ user_query: query })
       });
 
@@ -31,14 +32,16 @@ const KitchenAssistant = () => {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
+      const form = await response.formData();
+      const data = JSON.parse(form.get('metadata')); // no filename, so it's a string part
       
       // Show text
       displayRecipeText(data.text);
       
       // Play audio if available
-      if (data.audio_base64) {
-        playAudio(data.audio_base64);
+      const audioBlob = form.get('audio');
+      if (audioBlob && audioBlob.size > 0) {
+        playAudio(audioBlob);
       }
     } catch (err) {
       console.error('Error calling kitchen assistant:', err);
@@ -52,11 +55,9 @@ const KitchenAssistant = () => {
     setResponseText(text);
   }
 
-  function playAudio(audioBase64) {
+  function playAudio(audioBlob) {
     try {
       setIsPlaying(true);
-      const audioBytes = Uint8Array.from(atob(audioBase64), c => c.charCodeAt(0));
-      const audioBlob = new Blob([audioBytes], { type: 'audio/mpeg' });
       const audioUrl = URL.createObjectURL(audioBlob);
       const audio = new Audio(audioUrl);
       
@@ -126,6 +126,7 @@ const VoiceCommand = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Accept': 'multipart/form-data', // binary audio part instead of base64 in JSON
         },
         body: JSON.stringify({ user_query: text }), // Changed from 'message' to 'user_query'
       });
@@ -134,14 +135,16 @@ const VoiceCommand = () => {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
+      const form = await response.formData();
+      const data = JSON.parse(form.get('metadata')); // no filename, so it's a string part
       
       // Display text response
       setResponse(data.text || 'No response from server');
       
       // Play audio if available
-      if (data.audio_base64) {
-        playAudio(data.audio_base64);
+      const audioBlob = form.get('audio');
+      if (audioBlob && audioBlob.size > 0) {
+        playAudio(audioBlob);
       }
       
       console.log('Backend response:', data);
@@ -153,12 +156,10 @@ const VoiceCommand = () => {
     }
   };
 
-  // Play audio from base64
-  const playAudio = (audioBase64) => {
+  // Play the mp3 part of the response
+  const playAudio = (audioBlob) => {
     try {
       setIsPlayingAudio(true);
-      const audioBytes = Uint8Array.from(atob(audioBase64), c => c.charCodeAt(0));
-      const audioBlob = new Blob([audioBytes], { type: 'audio/mpeg' });
       const audioUrl = URL.createObjectURL(audioBlob);
       const audio = new Audio(audioUrl);
       